@@ -1,18 +1,43 @@
-from flask import Flask, request, jsonify, session
+# 기본은 Flask 서버(threaded) + C 확장 MariaDB 커넥터.
+# SERVER_MODE=gevent 는 /messages/stream 전용 배포(backend-stream)에서만 사용하여
+# 장기 SSE 연결이 OS 스레드를 점유하지 않게 함. monkey patch는 다른 import보다 먼저 적용해야 함
+import os
+SERVER_MODE = os.getenv('SERVER_MODE', 'threaded')
+if SERVER_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, Response, request, jsonify, session
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import redis
 import mysql.connector
-import json
-from datetime import datetime
-import os
+import serialization
+import rollups
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from singleflight import SingleFlight
+from rate_limit import RateLimiter, classify_route
+from db_router import ReplicaRouter, DB_ROUTED_CONNECTIONS
+from live_feed import MessageFeed
+from user_directory import UserDirectory
+from data_access import ConnectionPool, DataAccess
+from datetime import datetime, timedelta
 from kafka import KafkaProducer, KafkaConsumer
 from functools import wraps
 from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.http import http_date
+from werkzeug.middleware.proxy_fix import ProxyFix
 from threading import Thread
 import threading
+import time
 import logging
 import sys
 import traceback
+import queue
+import csv
+import io
+import re
+import zlib
 
 # OpenTelemetry imports
 from opentelemetry import trace, metrics
@@ -34,6 +59,7 @@ from opentelemetry.instrumentation.redis import RedisInstrumentor
 from opentelemetry.instrumentation.logging import LoggingInstrumentor
 from opentelemetry.instrumentation.urllib3 import URLLib3Instrumentor
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
+from telemetry import KeepErrorsAndSlowSpanProcessor, build_sampler, low_value_scope
 
 # Prometheus 메트릭 정의
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
@@ -41,6 +67,8 @@ REQUEST_DURATION = Histogram('http_request_duration_seconds', 'HTTP request dura
 ACTIVE_USERS = Gauge('active_users_total', 'Total active users')
 DB_CONNECTIONS = Gauge('database_connections_active', 'Active database connections')
 REDIS_CONNECTIONS = Gauge('redis_connections_active', 'Active Redis connections')
+INFLIGHT_REQUESTS = Gauge('http_requests_inflight', 'In-flight HTTP requests in this process')
+SHED_REQUESTS = Counter('http_requests_shed_total', 'Requests rejected by load shedding', ['endpoint'])
 
 # 자동계측만 사용 (수동 메트릭 제거)
 
@@ -59,8 +87,8 @@ def setup_opentelemetry():
     })
     
     
-    # TracerProvider 설정
-    tracer_provider = TracerProvider(resource=resource)
+    # TracerProvider 설정 (ParentBased + 라우트별 비율 샘플링)
+    tracer_provider = TracerProvider(resource=resource, sampler=build_sampler())
     trace.set_tracer_provider(tracer_provider)
     tracer = trace.get_tracer(__name__)
     
@@ -98,6 +126,8 @@ def setup_opentelemetry():
         schedule_delay_millis=5000  # 5초마다 배치 전송
     )
     tracer_provider.add_span_processor(span_processor)
+    # 샘플링되지 않은 요청 중 에러/느린 요청의 root span은 항상 내보냄
+    tracer_provider.add_span_processor(KeepErrorsAndSlowSpanProcessor(otlp_exporter))
 
     
     # Metrics Exporter 설정 (기본 헤더 사용)
@@ -174,9 +204,35 @@ def setup_opentelemetry():
     
 
 
+# serialization 모듈(orjson/json)을 사용하는 Flask JSON provider
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        return serialization.dumps(
+            obj,
+            default=kwargs.get('default', self.default),
+            sort_keys=kwargs.get('sort_keys', self.sort_keys)
+        )
+
+    def loads(self, s, **kwargs):
+        return serialization.loads(s)
+
+    def response(self, *args, **kwargs):
+        # bytes로 바로 직렬화하여 str -> bytes 변환을 생략
+        obj = self._prepare_response_obj(args, kwargs)
+        body = serialization.dumps_bytes(obj, default=self.default, sort_keys=self.sort_keys)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
 app = Flask(__name__)
-CORS(app, supports_credentials=True)  # 세션을 위한 credentials 지원
+app.json = FastJSONProvider(app)
+CORS(app, supports_credentials=True, expose_headers=['X-Next-Cursor'])  # 세션을 위한 credentials 지원, 페이지 커서 헤더 노출
 app.secret_key = os.getenv('FLASK_SECRET_KEY', 'your-secret-key-here')  # 세션을 위한 시크릿 키
+# 요청은 프록시를 거쳐 들어오므로 신뢰하는 프록시 수만큼 X-Forwarded-For를 따라가
+# 실제 클라이언트 IP를 request.remote_addr로 사용 (rate limit 기준)
+# 기본값 2: 운영 경로 ingress-nginx -> frontend nginx(/api/) -> backend (배포 매니페스트에서 명시)
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', '2'))
+if TRUSTED_PROXY_HOPS > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
 
 # 자동계측 사용으로 tracer 전역 변수 제거
 
@@ -201,6 +257,8 @@ logger.info(f"MARIADB_PASSWORD: {'****' if os.getenv('MARIADB_PASSWORD') else 'N
 logger.info(f"REDIS_HOST: {os.getenv('REDIS_HOST', 'NOT_SET')}")
 logger.info(f"KAFKA_SERVERS: {os.getenv('KAFKA_SERVERS', 'NOT_SET')}")
 logger.info(f"OTEL_EXPORTER_OTLP_ENDPOINT: {os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'NOT_SET')}")
+logger.info(f"JSON_BACKEND: {serialization.codec.name}")
+logger.info(f"KAFKA_LOG_FORMAT: {serialization.KAFKA_LOG_FORMAT}")
 logger.info(f"OTEL_EXPORTER_OTLP_PROTOCOL: {os.getenv('OTEL_EXPORTER_OTLP_PROTOCOL', 'NOT_SET')}")
 logger.info("===================")
 
@@ -334,33 +392,85 @@ def log_system_stats():
 # # 스레드 풀 생성
 # thread_pool = ThreadPoolExecutor(max_workers=5)
 
-# MariaDB 연결 함수
-def get_db_connection():
+# 외부 의존성 타임아웃 (장애 시 요청마다 긴 대기가 발생하지 않도록 짧게 유지)
+MARIADB_CONNECT_TIMEOUT = int(os.getenv('MARIADB_CONNECT_TIMEOUT', '5'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+KAFKA_MAX_BLOCK_MS = int(os.getenv('KAFKA_MAX_BLOCK_MS', '3000'))
+
+# 의존성별 Circuit Breaker (상태는 /metrics의 circuit_breaker_* 메트릭으로 노출)
+db_breaker = CircuitBreaker('mariadb')
+redis_breaker = CircuitBreaker('redis')
+redis_replica_breaker = CircuitBreaker('redis_replica')
+kafka_breaker = CircuitBreaker('kafka')
+
+# MariaDB 호스트 연결 (primary/복제본 공용)
+def connect_mariadb(host):
+    return mysql.connector.connect(
+        host=host,
+        user=os.getenv('MARIADB_USER', 'testuser'),
+        password=os.getenv('MARIADB_PASSWORD'),
+        port=3306,
+        database="testdb",
+        connect_timeout=MARIADB_CONNECT_TIMEOUT,
+        # C 확장은 gevent 이벤트 루프를 블로킹하므로 gevent 모드(스트림 전용 배포)에서만 순수 파이썬 구현 사용
+        use_pure=SERVER_MODE == 'gevent'
+    )
+
+# 호스트별 연결 풀 (연결마다 prepared statement를 캐시하므로 연결 재사용이 전제)
+db_pool = ConnectionPool(
+    connect=connect_mariadb,
+    max_idle=int(os.getenv('MARIADB_POOL_SIZE', '8')),
+    idle_timeout=float(os.getenv('MARIADB_POOL_IDLE_TIMEOUT', '60')),
+    statement_cache_size=int(os.getenv('MARIADB_STMT_CACHE_SIZE', '64'))
+)
+
+# MariaDB 읽기 복제본 라우터 (MARIADB_REPLICA_HOSTS가 비어 있으면 모든 쿼리가 primary 사용)
+MARIADB_MAX_REPLICA_LAG = float(os.getenv('MARIADB_MAX_REPLICA_LAG', '5'))
+# 쓰기 직후 이 시간(초) 동안은 같은 세션의 읽기를 primary로 보냄 (read-your-own-writes)
+READ_YOUR_WRITES_SECONDS = float(os.getenv('READ_YOUR_WRITES_SECONDS', str(MARIADB_MAX_REPLICA_LAG)))
+db_replica_router = ReplicaRouter(
+    hosts=[h.strip() for h in os.getenv('MARIADB_REPLICA_HOSTS', '').split(',') if h.strip()],
+    connect=db_pool.acquire,
+    max_lag=MARIADB_MAX_REPLICA_LAG,
+    lag_check_interval=float(os.getenv('MARIADB_REPLICA_LAG_CHECK_INTERVAL', '10'))
+)
+
+def mark_session_write():
+    """쓰기 시각 기록 (이후 짧은 시간 동안 읽기를 primary로 고정)"""
+    session['last_write_at'] = time.time()
+
+def can_read_from_replica():
+    return time.time() - session.get('last_write_at', 0) > READ_YOUR_WRITES_SECONDS
+
+# MariaDB 연결 함수 (readonly=True 이면 가능한 경우 복제본 사용, 풀 연결을 반환하며 close()는 반납)
+def get_db_connection(readonly=False):
+    if readonly and db_replica_router.enabled:
+        connection = db_replica_router.connect()
+        if connection is not None:
+            return connection
+        logger.warning("사용 가능한 MariaDB 복제본이 없어 primary로 연결")
+    
     start_time = datetime.now()
     try:
         logger.info("=== MariaDB 연결 시도 ===")
         host = os.getenv('MARIADB_HOST', 'my-mariadb')
         user = os.getenv('MARIADB_USER', 'testuser')
-        password = os.getenv('MARIADB_PASSWORD')
         database = "testdb"
         
         logger.info(f"연결 정보: host={host}, user={user}, database={database}")
         logger.debug(f"연결 시작 시간: {start_time}")
         
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            port=3306,
-            database=database,
-            connect_timeout=30
-        )
+        connection = db_breaker.call(db_pool.acquire, host)
+        DB_ROUTED_CONNECTIONS.labels(target='primary').inc()
         
         connection_time = (datetime.now() - start_time).total_seconds()
         logger.info(f"MariaDB 연결 성공! (소요시간: {connection_time:.3f}초)")
-        logger.debug(f"연결 ID: {connection.connection_id if hasattr(connection, 'connection_id') else 'N/A'}")
+        logger.debug(f"연결 ID: {getattr(connection.raw, 'connection_id', 'N/A')} (재사용: {connection.reused})")
         
         return connection
+    except CircuitOpenError as e:
+        logger.warning(f"MariaDB 연결 생략: {str(e)}")
+        raise
     except Exception as e:
         connection_time = (datetime.now() - start_time).total_seconds()
         logger.error(f"MariaDB 연결 실패 (소요시간: {connection_time:.3f}초): {str(e)}")
@@ -381,15 +491,19 @@ def get_redis_connection():
             username='default',  # Redis 기본 사용자명
             password=os.getenv('REDIS_PASSWORD'),
             decode_responses=True,
-            db=0
+            db=0,
+            socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT
         )
         
-        # 연결 테스트
-        redis_client.ping()
+        # 연결 테스트 (breaker가 열려 있으면 ping 없이 즉시 실패)
+        redis_breaker.call(redis_client.ping)
         connection_time = (datetime.now() - start_time).total_seconds()
         logger.debug(f"Redis 마스터 연결 성공! (소요시간: {connection_time:.3f}초)")
         
         return redis_client
+    except CircuitOpenError:
+        raise
     except Exception as e:
         connection_time = (datetime.now() - start_time).total_seconds()
         logger.error(f"Redis 마스터 연결 실패 (소요시간: {connection_time:.3f}초): {str(e)}")
@@ -397,15 +511,49 @@ def get_redis_connection():
 
 # Redis 읽기 전용 연결 함수
 def get_redis_readonly_connection():
-    return redis.Redis(
+    redis_client = redis.Redis(
         host=os.getenv('REDIS_REPLICA_HOST', 'redis-replicas.sungho.svc.cluster.local'),
         port=6379,
         username='default',  # Redis 기본 사용자명
         password=os.getenv('REDIS_PASSWORD'),
         decode_responses=True,
-        db=0
+        db=0,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT
+    )
+    redis_replica_breaker.call(redis_client.ping)
+    return redis_client
+
+# 요청마다 연결/ping하지 않는 장기 Redis 클라이언트 (connection pool 공유, rate limit/유저 조회 캐시용)
+shared_redis_client = redis.Redis(
+    host=os.getenv('REDIS_HOST', 'redis-master.sungho.svc.cluster.local'),
+    port=6379,
+    username='default',
+    password=os.getenv('REDIS_PASSWORD'),
+    decode_responses=True,
+    db=0,
+    socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_timeout=REDIS_SOCKET_TIMEOUT
+)
+
+# 새 메시지 SSE 피드 (프로세스당 Redis pub/sub 구독 1개를 모든 SSE 클라이언트가 공유)
+def get_redis_pubsub_connection():
+    return redis.Redis(
+        host=os.getenv('REDIS_HOST', 'redis-master.sungho.svc.cluster.local'),
+        port=6379,
+        username='default',
+        password=os.getenv('REDIS_PASSWORD'),
+        decode_responses=True,
+        db=0,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30
     )
 
+message_feed = MessageFeed(
+    redis_factory=get_redis_pubsub_connection,
+    client_queue_size=int(os.getenv('SSE_CLIENT_QUEUE_SIZE', '256'))
+)
+
 # Kafka Producer 설정
 def get_kafka_producer():
     start_time = datetime.now()
@@ -416,11 +564,13 @@ def get_kafka_producer():
         
         producer = KafkaProducer(
             bootstrap_servers=servers,
-            value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+            value_serializer=serialization.api_log_serializer,
             security_protocol='SASL_PLAINTEXT',
             sasl_mechanism='PLAIN',
             sasl_plain_username=username,
-            sasl_plain_password=os.getenv('KAFKA_PASSWORD', '')
+            sasl_plain_password=os.getenv('KAFKA_PASSWORD', ''),
+            max_block_ms=KAFKA_MAX_BLOCK_MS,
+            request_timeout_ms=KAFKA_MAX_BLOCK_MS
         )
         
         connection_time = (datetime.now() - start_time).total_seconds()
@@ -432,8 +582,76 @@ def get_kafka_producer():
         logger.error(f"Kafka Producer 생성 실패 (소요시간: {connection_time:.3f}초): {str(e)}")
         raise e
 
+# 읽기 쿼리 single-flight (QUERY_MICROCACHE_MS > 0 이면 완료된 결과를 짧게 재사용)
+read_query_flight = SingleFlight('db_read', cache_ttl=int(os.getenv('QUERY_MICROCACHE_MS', '0')) / 1000)
+
+# 모든 메시지/사용자 SQL은 data_access 모듈에서 실행 (prepared statement, namedtuple 행)
+db_access = DataAccess(get_db_connection, breaker=db_breaker)
+
+def coalesced_read(query, *args):
+    """동일한 읽기 쿼리/인자의 동시 호출은 하나의 DB 실행 결과를 공유 (결과는 읽기 전용으로 사용)"""
+    # 복제본/primary 결과가 섞이지 않도록 라우팅 대상을 키에 포함
+    use_replica = can_read_from_replica()
+    key = (use_replica, query.__name__, args)
+    return read_query_flight.do(key, lambda: query(*args, readonly=use_replica))
+
+# username <-> user_id 캐시 (메시지 조회에서 users JOIN 대신 사용)
+user_directory = UserDirectory(
+    redis_client=shared_redis_client,
+    load_by_ids=db_access.users_by_ids,
+    load_by_usernames=db_access.users_by_usernames,
+    breaker=redis_breaker,
+    local_ttl=float(os.getenv('USER_CACHE_TTL', '300'))
+)
+
+def find_user_ids_like(fragment):
+    """유저명 부분 일치 검색 (users 테이블만 조회하고 결과는 캐시에 기록)"""
+    rows = coalesced_read(db_access.users_matching, fragment)
+    user_directory.remember(rows, persist=False)
+    return [user_id for user_id, _ in rows]
+
+def with_usernames(rows):
+    """MessageRow 목록을 응답용 dict 목록으로 변환 (유저를 찾을 수 없는 행은 기존 JOIN과 같이 제외)"""
+    names = user_directory.usernames_of({row.user_id for row in rows})
+    return [
+        {'id': row.id, 'message': row.message, 'created_at': row.created_at, 'username': names[row.user_id]}
+        for row in rows if row.user_id in names
+    ]
+
+# 기간 필터 (messages 테이블은 created_at 월별 파티션이므로 기간을 주면 파티션 pruning 적용)
+def parse_time_window():
+    """since/until 쿼리 파라미터(ISO 8601)를 (since, until) datetime으로 변환, 형식 오류 시 ValueError"""
+    return tuple(
+        datetime.fromisoformat(request.args[name]) if request.args.get(name) else None
+        for name in ('since', 'until')
+    )
+
+# Redis 감사 로그 (Stream)
+# 고정 100개 List 대신 Stream에 저장하고, 보관 기간(REDIS_LOG_RETENTION_SECONDS)이 지난 항목은 MINID로 정리
+REDIS_LOG_STREAM = 'api_logs:stream'
+REDIS_LOG_RETENTION_SECONDS = int(os.getenv('REDIS_LOG_RETENTION_SECONDS', '86400'))
+REDIS_LOG_MAXLEN = int(os.getenv('REDIS_LOG_MAXLEN', '100000'))  # 보관 기간과 별개의 상한
+REDIS_LOG_PAGE_SIZE = 100
+REDIS_LOG_MAX_PAGE_SIZE = 1000
+REDIS_LOG_ID_PATTERN = re.compile(r'^\d+(-\d+)?$')  # Stream 항목 ID (ms 또는 ms-seq)
+REDIS_STREAM_MAX_SEQ = 2 ** 64 - 1
+
+def previous_stream_id(entry_id):
+    """entry_id 바로 이전의 Stream ID (최신 순 페이지에서 다음 페이지의 시작점, 포함 범위로 사용)"""
+    ms, _, seq = entry_id.partition('-')
+    ms, seq = int(ms), int(seq or 0)
+    if seq > 0:
+        return f"{ms}-{seq - 1}"
+    if ms > 0:
+        return f"{ms - 1}-{REDIS_STREAM_MAX_SEQ}"
+    return None
+
 # 로깅 함수
 def log_to_redis(action, details):
+    with low_value_scope():
+        _log_to_redis(action, details)
+
+def _log_to_redis(action, details):
     start_time = datetime.now()
     try:
         logger.debug(f"Redis 로그 저장 시작: action={action}")
@@ -447,20 +665,24 @@ def log_to_redis(action, details):
             'pid': os.getpid()
         }
         
-        # 로그 저장
-        redis_client.lpush('api_logs', json.dumps(log_entry))
-        redis_client.ltrim('api_logs', 0, 99)  # 최근 100개 로그만 유지
-        
-        # 로그 통계 업데이트
+        # 로그 저장 및 통계 업데이트를 한 번의 왕복으로 처리
+        min_id = int((time.time() - REDIS_LOG_RETENTION_SECONDS) * 1000)
         daily_key = f"daily_logs:{datetime.now().strftime('%Y-%m-%d')}"
-        redis_client.incr(daily_key)
-        redis_client.expire(daily_key, 86400 * 7)  # 7일 보관
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.xadd(REDIS_LOG_STREAM, log_entry, maxlen=REDIS_LOG_MAXLEN, approximate=True)
+        pipe.xtrim(REDIS_LOG_STREAM, minid=min_id, approximate=True)
+        pipe.incr(daily_key)
+        pipe.expire(daily_key, 86400 * 7)  # 7일 보관
+        pipe.execute()
         
         redis_client.close()
         
         log_time = (datetime.now() - start_time).total_seconds()
         logger.debug(f"Redis 로그 저장 완료 (소요시간: {log_time:.3f}초)")
         
+    except CircuitOpenError as e:
+        # 감사 로그는 선택적 기능이므로 Redis 장애 시 즉시 포기
+        logger.debug(f"Redis 로그 저장 생략: {str(e)}")
     except Exception as e:
         log_time = (datetime.now() - start_time).total_seconds()
         logger.error(f"Redis 로그 저장 실패 (소요시간: {log_time:.3f}초): {str(e)}")
@@ -468,36 +690,49 @@ def log_to_redis(action, details):
 
 # API 통계 로깅을 비동기로 처리하는 함수
 def async_log_api_stats(endpoint, method, status, user_id):
-    def _log():
-        start_time = datetime.now()
+    def _send():
+        producer = get_kafka_producer()
         try:
-            logger.debug(f"Kafka 로그 전송 시작: {method} {endpoint} - {status}")
-            producer = get_kafka_producer()
-            
             log_data = {
                 'timestamp': datetime.now().isoformat(),
                 'endpoint': endpoint,
                 'method': method,
                 'status': status,
                 'user_id': user_id,
-                'message': f"{user_id}가 {method} {endpoint} 호출 ({status})",
-                'source': 'aks-demo-backend',
-                'thread_id': threading.current_thread().ident,
                 'pid': os.getpid()
             }
+            # 바이너리 형식은 message/source/thread_id를 전송하지 않음
+            if serialization.KAFKA_LOG_FORMAT != 'binary':
+                log_data['message'] = serialization.api_log_message(user_id, method, endpoint, status)
+                log_data['source'] = serialization.API_LOG_SOURCE
+                log_data['thread_id'] = threading.current_thread().ident
             
             # Kafka로 전송
             future = producer.send('api-logs', log_data)
-            producer.flush(timeout=5)  # 5초 타임아웃
+            producer.flush(timeout=KAFKA_MAX_BLOCK_MS / 1000)
+        finally:
+            producer.close(timeout=1)
+
+    def _log():
+        start_time = datetime.now()
+        try:
+            logger.debug(f"Kafka 로그 전송 시작: {method} {endpoint} - {status}")
+            kafka_breaker.call(_send)
             
             log_time = (datetime.now() - start_time).total_seconds()
             logger.debug(f"Kafka 로그 전송 완료 (소요시간: {log_time:.3f}초)")
             
+        except CircuitOpenError as e:
+            logger.debug(f"Kafka 로그 전송 생략: {str(e)}")
         except Exception as e:
             log_time = (datetime.now() - start_time).total_seconds()
             logger.error(f"Kafka 로그 전송 실패 (소요시간: {log_time:.3f}초): {str(e)}")
             print(f"Kafka logging error: {str(e)}")
     
+    # Kafka 장애 중에는 스레드를 만들지 않고 즉시 포기
+    if kafka_breaker.is_open():
+        return
+    
     # 새로운 스레드에서 로깅 실행
     thread = Thread(target=_log, name=f"kafka-log-{endpoint}-{method}")
     thread.start()
@@ -521,14 +756,10 @@ def login_required(f):
 def save_to_db():
     try:
         user_id = session['user_id']
-        db = get_db_connection()
         data = request.json
-        cursor = db.cursor()
-        sql = "INSERT INTO messages (message, created_at) VALUES (%s, %s)"
-        cursor.execute(sql, (data['message'], datetime.now()))
-        db.commit()
-        cursor.close()
-        db.close()
+        db_access.insert_unowned_message(data['message'], datetime.now())
+        read_query_flight.invalidate()
+        mark_session_write()
         
         # 로깅
         log_to_redis('db_insert', f"Message saved: {data['message'][:30]}...")
@@ -545,12 +776,7 @@ def save_to_db():
 def get_from_db():
     try:
         user_id = session['user_id']
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM messages ORDER BY created_at DESC")
-        messages = cursor.fetchall()
-        cursor.close()
-        db.close()
+        messages = [row._asdict() for row in db_access.list_messages(readonly=can_read_from_replica())]
         
         # 비동기 로깅으로 변경
         async_log_api_stats('/db/messages', 'GET', 'success', session.get('username', 'unknown'))
@@ -570,24 +796,63 @@ def get_redis_logs():
         redis_password = os.getenv('REDIS_PASSWORD')
         logger.info(f"Redis 연결 시도: host={redis_host}, username=default, password={'*' * len(redis_password) if redis_password else 'None'}")
         
+        # 조회 조건: after(이 ID 이후, 오래된 순), since/until(기간), limit(페이지 크기)
+        # after가 없으면 최신 순으로 반환하고, 더 오래된 로그가 남아 있을 수 있으면
+        # X-Next-Cursor 헤더로 다음 페이지 시작 ID를 알려줌 (before=<값>으로 전달, 해당 ID 포함)
+        after = request.args.get('after')
+        before = request.args.get('before')
+        since = request.args.get('since')
+        until = request.args.get('until')
+        limit = min(int(request.args.get('limit', REDIS_LOG_PAGE_SIZE)), REDIS_LOG_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit은 1 이상이어야 합니다")
+        for name, value in (('after', after), ('before', before)):
+            if value and not REDIS_LOG_ID_PATTERN.match(value):
+                raise ValueError(f"{name}는 Stream ID 형식(<ms> 또는 <ms>-<seq>)이어야 합니다: {value}")
+        for first, second in (('after', 'since'), ('after', 'before'), ('before', 'until')):
+            if request.args.get(first) and request.args.get(second):
+                raise ValueError(f"{first}와 {second}는 함께 사용할 수 없습니다")
+        min_id = f"({after}" if after else '-'
+        max_id = before or '+'
+        if since:
+            min_id = str(int(datetime.fromisoformat(since).timestamp() * 1000))
+        if until:
+            max_id = f"({int(datetime.fromisoformat(until).timestamp() * 1000)}"
+        
+        # 연결 시 ping 테스트 포함
         redis_client = get_redis_readonly_connection()
+        logger.info("Redis ping 성공")
         
-        # Redis ping 테스트
-        ping_result = redis_client.ping()
-        logger.info(f"Redis ping 성공: {ping_result}")
-        
-        logs = redis_client.lrange('api_logs', 0, -1)
+        if after:
+            entries = redis_client.xrange(REDIS_LOG_STREAM, min=min_id, max=max_id, count=limit)
+        else:
+            entries = redis_client.xrevrange(REDIS_LOG_STREAM, max=max_id, min=min_id, count=limit)
         redis_client.close()
         
-        # 로그가 없으면 샘플 로그 반환
-        if not logs:
+        logs = []
+        for entry_id, fields in entries:
+            fields['id'] = entry_id
+            if 'pid' in fields:
+                fields['pid'] = int(fields['pid'])
+            logs.append(fields)
+        
+        # 조건 없이 조회했는데 로그가 없으면 샘플 로그 반환
+        if not logs and not (after or before or since or until):
             sample_logs = [
                 {"timestamp": datetime.now().isoformat(), "level": "INFO", "message": "Redis 연결 성공", "service": "redis"},
                 {"timestamp": datetime.now().isoformat(), "level": "INFO", "message": "Redis 로그 조회 완료", "service": "redis"}
             ]
             return jsonify(sample_logs)
         
-        return jsonify([json.loads(log) for log in logs])
+        response = jsonify(logs)
+        # 최신 순 조회에서 페이지가 가득 찼으면 더 오래된 로그가 있을 수 있으므로 다음 페이지 시작 ID 전달
+        if not after and len(entries) == limit:
+            next_id = previous_stream_id(entries[-1][0])
+            if next_id:
+                response.headers['X-Next-Cursor'] = next_id
+        return response
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 파라미터입니다: {str(e)}"}), 400
     except Exception as e:
         logger.error(f"Redis 연결 실패: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -613,28 +878,16 @@ def register():
         logger.info("비밀번호 해시화 중...")
         hashed_password = generate_password_hash(password)
         
-        logger.info("데이터베이스 연결 시도...")
-        db = get_db_connection()
-        cursor = db.cursor()
-        
         logger.info("사용자명 중복 체크...")
         # 사용자명 중복 체크
-        cursor.execute("SELECT username FROM users WHERE username = %s", (username,))
-        existing_user = cursor.fetchone()
-        
-        if existing_user:
+        if db_access.username_exists(username):
             logger.warning(f"중복된 사용자명: {username}")
-            cursor.close()
-            db.close()
             return jsonify({"status": "error", "message": "이미 존재하는 사용자명입니다"}), 400
         
         logger.info("새 사용자 데이터 삽입 중...")
         # 사용자 정보 저장
-        sql = "INSERT INTO users (username, password) VALUES (%s, %s)"
-        cursor.execute(sql, (username, hashed_password))
-        db.commit()
-        cursor.close()
-        db.close()
+        user_id = db_access.create_user(username, hashed_password)
+        user_directory.remember([(user_id, username)])
         
         logger.info(f"회원가입 성공: {username}")
         return jsonify({"status": "success", "message": "회원가입이 완료되었습니다"})
@@ -662,26 +915,22 @@ def login():
         if not username or not password:
             return jsonify({"status": "error", "message": "사용자명과 비밀번호는 필수입니다"}), 400
         
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM users WHERE username = %s", (username,))
-        user = cursor.fetchone()
-        cursor.close()
-        db.close()
+        user = db_access.find_login_user(username)
         
-        if user and check_password_hash(user['password'], password):
-            session['user_id'] = user['id']  # 세션에 사용자 ID 저장
+        if user and check_password_hash(user.password, password):
+            session['user_id'] = user.id  # 세션에 사용자 ID 저장
             session['username'] = username  # 세션에 사용자명 저장
+            user_directory.remember([(user.id, user.username)])
             
             # Redis 세션 저장 (선택적)
             try:
                 redis_client = get_redis_connection()
                 session_data = {
-                    'user_id': user['id'],
+                    'user_id': user.id,
                     'username': username,
                     'login_time': datetime.now().isoformat()
                 }
-                redis_client.set(f"session:{username}", json.dumps(session_data))
+                redis_client.set(f"session:{username}", serialization.dumps(session_data))
                 redis_client.expire(f"session:{username}", 3600)
             except Exception as redis_error:
                 print(f"Redis session error: {str(redis_error)}")
@@ -706,8 +955,13 @@ def logout():
         if 'user_id' in session:
             username = session.get('username', '')
             if username:
-                redis_client = get_redis_connection()
-                redis_client.delete(f"session:{username}")
+                # Redis 세션 삭제 (선택적 - Redis 장애가 로그아웃을 막지 않도록)
+                try:
+                    redis_client = get_redis_connection()
+                    redis_client.delete(f"session:{username}")
+                    redis_client.close()
+                except Exception as redis_error:
+                    logger.warning(f"Redis 세션 삭제 실패: {str(redis_error)}")
             session.pop('user_id', None)
             session.pop('username', None)
         return jsonify({"status": "success", "message": "로그아웃 성공"})
@@ -726,14 +980,25 @@ def save_message():
         if not message_text:
             return jsonify({"status": "error", "message": "메시지 내용은 필수입니다"}), 400
         
-        # DB에 메시지 저장
-        db = get_db_connection()
-        cursor = db.cursor()
-        sql = "INSERT INTO messages (user_id, message) VALUES (%s, %s)"
-        cursor.execute(sql, (user_id, message_text))
-        db.commit()
-        cursor.close()
-        db.close()
+        # DB에 메시지 저장 (RETURNING으로 SSE 이벤트에 필요한 id/created_at을 함께 조회)
+        message_id, created_at = db_access.insert_message(user_id, message_text)
+        read_query_flight.invalidate()
+        mark_session_write()
+        
+        # SSE 구독자에게 새 메시지 전달 (실패해도 저장은 성공)
+        # 발행에 실패한 메시지는 연결 중인 구독자에게 실시간으로 전달되지 않으며,
+        # 재연결 시 Last-Event-ID 이후 DB 보충 조회나 목록 재조회로만 받을 수 있음
+        try:
+            redis_client = get_redis_connection()
+            message_feed.publish(redis_client, {
+                'id': message_id,
+                'message': message_text,
+                'created_at': http_date(created_at),
+                'username': user_directory.usernames_of([user_id]).get(user_id, session.get('username'))
+            })
+            redis_client.close()
+        except Exception as e:
+            logger.warning(f"새 메시지 이벤트 발행 실패: {str(e)}")
         
         # Redis 로깅 추가
         log_to_redis('message_save', f"Message saved by {session.get('username', 'unknown')}: {message_text[:30]}...")
@@ -755,34 +1020,13 @@ def search_messages():
         query = request.args.get('q', '')
         user_filter = request.args.get('user', '')  # 특정 유저로 필터링
         
-        # DB에서 검색 (JOIN으로 유저명 포함)
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        
+        # DB에서 검색 (유저명은 user directory에서 붙임, 동일 검색은 single-flight로 병합)
+        since, until = parse_time_window()
+        user_ids = None
         if user_filter:
-            # 특정 유저의 메시지만 검색
-            sql = """
-                SELECT m.id, m.message, m.created_at, u.username 
-                FROM messages m 
-                JOIN users u ON m.user_id = u.id 
-                WHERE m.message LIKE %s AND u.username LIKE %s 
-                ORDER BY m.created_at DESC
-            """
-            cursor.execute(sql, (f"%{query}%", f"%{user_filter}%"))
-        else:
-            # 모든 메시지 검색
-            sql = """
-                SELECT m.id, m.message, m.created_at, u.username 
-                FROM messages m 
-                JOIN users u ON m.user_id = u.id 
-                WHERE m.message LIKE %s 
-                ORDER BY m.created_at DESC
-            """
-            cursor.execute(sql, (f"%{query}%",))
-        
-        results = cursor.fetchall()
-        cursor.close()
-        db.close()
+            # 특정 유저의 메시지만 검색 (유저명 부분 일치 -> user_id 목록)
+            user_ids = tuple(find_user_ids_like(user_filter))
+        results = with_usernames(coalesced_read(db_access.list_messages, query, user_ids, since, until))
         
         # Redis 로깅 추가
         log_to_redis('message_search', f"Search query: '{query}', user_filter: '{user_filter}', results: {len(results)}")
@@ -790,6 +1034,8 @@ def search_messages():
         logger.info(f"메시지 검색 성공: 쿼리={query}, 유저필터={user_filter}, 결과수={len(results)}")
         return jsonify({"status": "success", "data": results})
         
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 기간 형식입니다: {str(e)}"}), 400
     except Exception as e:
         # 에러 시에도 Redis 로깅
         log_to_redis('message_search_error', f"Error searching messages: {str(e)}")
@@ -801,20 +1047,13 @@ def search_messages():
 @login_required
 def get_user_messages(username):
     try:
-        # DB에서 특정 유저의 메시지 조회
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        sql = """
-            SELECT m.id, m.message, m.created_at, u.username 
-            FROM messages m 
-            JOIN users u ON m.user_id = u.id 
-            WHERE u.username = %s 
-            ORDER BY m.created_at DESC
-        """
-        cursor.execute(sql, (username,))
-        results = cursor.fetchall()
-        cursor.close()
-        db.close()
+        # DB에서 특정 유저의 메시지 조회 (user_id로 필터링하여 (user_id, created_at) 인덱스 사용)
+        since, until = parse_time_window()
+        user_id = user_directory.id_of(username)
+        if user_id is None:
+            results = []
+        else:
+            results = with_usernames(coalesced_read(db_access.list_messages, None, (user_id,), since, until))
         
         # Redis 로깅 추가
         log_to_redis('user_messages', f"User messages retrieved for: {username}, count: {len(results)}")
@@ -822,6 +1061,8 @@ def get_user_messages(username):
         logger.info(f"유저별 메시지 조회 성공: {username}, 메시지수={len(results)}")
         return jsonify({"status": "success", "data": results})
         
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 기간 형식입니다: {str(e)}"}), 400
     except Exception as e:
         # 에러 시에도 Redis 로깅
         log_to_redis('user_messages_error', f"Error retrieving user messages for {username}: {str(e)}")
@@ -833,19 +1074,9 @@ def get_user_messages(username):
 @login_required
 def get_all_messages():
     try:
-        # DB에서 모든 메시지 조회 (JOIN으로 유저명 포함)
-        db = get_db_connection()
-        cursor = db.cursor(dictionary=True)
-        sql = """
-            SELECT m.id, m.message, m.created_at, u.username 
-            FROM messages m 
-            JOIN users u ON m.user_id = u.id 
-            ORDER BY m.created_at DESC
-        """
-        cursor.execute(sql)
-        results = cursor.fetchall()
-        cursor.close()
-        db.close()
+        # DB에서 모든 메시지 조회 (유저명은 user directory에서 붙임)
+        since, until = parse_time_window()
+        results = with_usernames(coalesced_read(db_access.list_messages, None, None, since, until))
         
         # Redis 로깅 추가
         log_to_redis('all_messages', f"All messages retrieved, count: {len(results)}")
@@ -853,33 +1084,240 @@ def get_all_messages():
         logger.info(f"전체 메시지 조회 성공: 메시지수={len(results)}")
         return jsonify({"status": "success", "data": results})
         
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 기간 형식입니다: {str(e)}"}), 400
     except Exception as e:
         # 에러 시에도 Redis 로깅
         log_to_redis('all_messages_error', f"Error retrieving all messages: {str(e)}")
         logger.error(f"전체 메시지 조회 오류: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# 메시지 대량 내보내기 (NDJSON/CSV 스트리밍)
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_FIELDS = ('id', 'username', 'message', 'created_at')
+
+@app.route('/messages/export', methods=['GET'])
+@login_required
+def export_messages():
+    """
+    전체 결과를 메모리에 올리지 않고 서버 측 커서(unbuffered)로 읽으면서 배치 단위로 전송
+    - format: ndjson(기본값) 또는 csv
+    - user: 특정 유저로 필터링, since/until: 기간 필터 (ISO 8601)
+    - cursor: 이전 내보내기에서 마지막으로 받은 id (그 다음 id부터 재개)
+    - Accept-Encoding에 gzip이 있으면 배치마다 flush되는 gzip 스트림으로 전송
+    """
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            return jsonify({"status": "error", "message": "format은 ndjson 또는 csv만 지원합니다"}), 400
+        
+        since, until = parse_time_window()
+        cursor_id = request.args.get('cursor')
+        after_id = int(cursor_id) if cursor_id else None
+        user_filter = request.args.get('user')
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 파라미터입니다: {str(e)}"}), 400
+    
+    # 제너레이터는 요청 컨텍스트 밖에서 실행되므로 세션 값은 미리 계산
+    use_replica = can_read_from_replica()
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    username = session.get('username', 'unknown')
+    
+    # 응답 헤더(200)를 보내기 전에 연결/쿼리 실행과 첫 배치 조회까지 마쳐서
+    # DB 장애(CircuitOpenError 등)는 스트림 중단이 아닌 500 JSON으로 응답
+    batches = None
+    try:
+        user_id = user_directory.id_of(user_filter) if user_filter else None
+        # 존재하지 않는 유저로 필터링하면 빈 결과
+        if user_filter and user_id is None:
+            first_rows = []
+        else:
+            batches = db_access.export_messages(after_id, user_id, since, until, EXPORT_BATCH_SIZE, readonly=use_replica)
+            first_rows = next(batches, [])
+    except Exception as e:
+        if batches is not None:
+            batches.close()
+        logger.error(f"메시지 내보내기 오류: {str(e)}")
+        async_log_api_stats('/messages/export', 'GET', 'error', username)
+        return jsonify({"status": "error", "message": str(e)}), 500
+    
+    def encode_batch(rows):
+        if export_format == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+            return buffer.getvalue().encode('utf-8')
+        return b''.join(serialization.dumps_bytes(dict(zip(EXPORT_FIELDS, row))) + b'\n' for row in rows)
+    
+    def with_export_usernames(rows):
+        # user_id -> username은 배치마다 user directory에서 한 번에 조회 (유저가 없는 행은 username 없이 내보냄)
+        names = user_directory.usernames_of({row[1] for row in rows})
+        return [(message_id, names.get(owner_id), message, created_at)
+                for message_id, owner_id, message, created_at in rows]
+    
+    def remaining_batches():
+        if first_rows:
+            yield with_export_usernames(first_rows)
+            if batches is not None:
+                for rows in batches:
+                    yield with_export_usernames(rows)
+    
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+        count = 0
+        status = 'error'
+        try:
+            if export_format == 'csv':
+                header = (','.join(EXPORT_FIELDS) + '\r\n').encode('utf-8')
+                yield compressor.compress(header) if compressor else header
+            for rows in remaining_batches():
+                count += len(rows)
+                chunk = encode_batch(rows)
+                if compressor:
+                    # 배치마다 sync flush하여 클라이언트가 즉시 압축 해제할 수 있게 함
+                    chunk = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                yield chunk
+            if compressor:
+                yield compressor.flush()
+            status = 'success'
+            logger.info(f"메시지 내보내기 완료: 사용자={username}, 형식={export_format}, 행수={count}")
+        except Exception as e:
+            # 헤더를 보낸 뒤의 오류는 상태 코드를 바꿀 수 없으므로 스트림을 끊고 기록만 함
+            logger.error(f"메시지 내보내기 중단: 사용자={username}, 전송 행수={count}, 오류={str(e)}")
+            raise
+        finally:
+            # 클라이언트가 중간에 끊으면 DB 커서/연결도 정리
+            if batches is not None:
+                batches.close()
+            async_log_api_stats('/messages/export', 'GET', status, username)
+    
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(generate(), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=messages.{export_format}'
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+# 새 메시지 실시간 스트림 (Server-Sent Events)
+SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_RETRY_MS = 3000
+SSE_REPLAY_LIMIT = 500
+SSE_SUBSCRIBE_TIMEOUT = REDIS_SOCKET_TIMEOUT * 2
+
+def format_sse(event):
+    return f"id: {event['id']}\nevent: message\ndata: {app.json.dumps(event)}\n\n"
+
+def matches_user(event, username):
+    # DB collation과 같이 유저명은 대소문자 무시
+    return (event.get('username') or '').lower() == username.lower()
+
+def load_messages_since(last_id, user_filter, use_replica):
+    """last_id 이후 메시지를 id 순으로 최대 SSE_REPLAY_LIMIT + 1개 조회 (재연결 보충용)"""
+    user_id = None
+    if user_filter:
+        user_id = user_directory.id_of(user_filter)
+        if user_id is None:
+            return []
+    rows = with_usernames(db_access.messages_after(last_id, user_id, SSE_REPLAY_LIMIT + 1, readonly=use_replica))
+    for row in rows:
+        row['created_at'] = http_date(row['created_at'])
+    return rows
+
+@app.route('/messages/stream', methods=['GET'])
+@login_required
+def stream_messages():
+    """
+    새 메시지만 SSE로 전달 (이벤트 id = 메시지 id)
+    - user: 특정 유저의 메시지만 수신
+    - last_id 또는 Last-Event-ID 헤더: 그 이후 메시지를 먼저 보충한 뒤 실시간 전달
+      (보충할 메시지가 너무 많으면 reset 이벤트를 보내 클라이언트가 목록을 다시 조회하게 함)
+    운영에서는 gevent 모드의 전용 배포(backend-stream)가 처리하여 대기 중인 연결이 greenlet 하나만 사용하며,
+    Redis 구독은 프로세스당 1개
+    """
+    user_filter = request.args.get('user')
+    try:
+        last_id = int(request.headers.get('Last-Event-ID') or request.args.get('last_id') or 0)
+    except ValueError:
+        return jsonify({"status": "error", "message": "잘못된 Last-Event-ID입니다"}), 400
+    
+    # 보충 조회 전에 구독(Redis SUBSCRIBE 확인까지 대기)해야 조회와 구독 사이의 메시지를 놓치지 않음
+    # (보충 결과와 겹치는 실시간 이벤트는 id로 제거)
+    try:
+        subscription = message_feed.subscribe(timeout=SSE_SUBSCRIBE_TIMEOUT)
+    except TimeoutError as e:
+        logger.error(f"메시지 스트림 구독 실패: {str(e)}")
+        return jsonify({"status": "error", "message": "실시간 메시지 채널을 사용할 수 없습니다"}), 503
+    backlog, reset = [], False
+    if last_id:
+        try:
+            # pub/sub 이벤트는 발행 실패/순서 역전으로 빠질 수 있으므로 항상 DB(id 인덱스)에서 보충
+            backlog = load_messages_since(last_id, user_filter, can_read_from_replica())
+        except Exception as e:
+            message_feed.unsubscribe(subscription)
+            logger.error(f"메시지 스트림 보충 조회 오류: {str(e)}")
+            return jsonify({"status": "error", "message": str(e)}), 500
+        if len(backlog) > SSE_REPLAY_LIMIT:
+            backlog, reset = [], True
+    replayed = {event['id'] for event in backlog}
+    
+    def generate():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if reset:
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog:
+                yield format_sse(event)
+            while not subscription.expired:
+                try:
+                    event = subscription.get(timeout=SSE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # 프록시 유휴 타임아웃 방지 및 끊어진 연결 감지
+                    yield ": keepalive\n\n"
+                    continue
+                if event['id'] <= last_id or event['id'] in replayed:
+                    continue
+                if user_filter and not matches_user(event, user_filter):
+                    continue
+                yield format_sse(event)
+        finally:
+            message_feed.unsubscribe(subscription)
+    
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx 프록시 버퍼링 해제
+    async_log_api_stats('/messages/stream', 'GET', 'success', session.get('username', 'unknown'))
+    return response
+
 # Kafka 로그 조회 엔드포인트
 @app.route('/logs/kafka', methods=['GET'])
 @login_required
 def get_kafka_logs():
     try:
-        consumer = KafkaConsumer(
+        # 연결/버전 확인이 Kafka 장애 시 오래 블로킹되지 않도록 Producer와 같은 타임아웃과 breaker 적용
+        consumer = kafka_breaker.call(
+            KafkaConsumer,
             'api-logs',
             bootstrap_servers=os.getenv('KAFKA_SERVERS', 'my-kafka:9092'),
-            value_deserializer=lambda m: json.loads(m.decode('utf-8')),
+            value_deserializer=serialization.safe_api_log_deserializer,
             security_protocol='SASL_PLAINTEXT',
             sasl_mechanism='PLAIN',
             sasl_plain_username=os.getenv('KAFKA_USERNAME', 'user1'),
             sasl_plain_password=os.getenv('KAFKA_PASSWORD', ''),
             group_id='api-logs-viewer',
             auto_offset_reset='earliest',
-            consumer_timeout_ms=5000
+            consumer_timeout_ms=5000,
+            request_timeout_ms=KAFKA_MAX_BLOCK_MS,
+            bootstrap_timeout_ms=KAFKA_MAX_BLOCK_MS
         )
         
         logs = []
         try:
             for message in consumer:
+                # 디코딩할 수 없는 레코드는 건너뜀
+                if message.value is None:
+                    continue
                 logs.append({
                     'timestamp': message.value['timestamp'],
                     'endpoint': message.value['endpoint'],
@@ -900,11 +1338,113 @@ def get_kafka_logs():
         print(f"Kafka log retrieval error: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
+# API 호출 집계 조회 (rollups.py worker가 api-logs 토픽에서 만든 분/시간 단위 rollup)
+STATS_MAX_BUCKETS = 60
+
+@app.route('/stats', methods=['GET'])
+@login_required
+def get_stats():
+    """
+    - resolution: minute(기본값) 또는 hour
+    - at: 기준 시각 (ISO 8601, 기본값: 현재), buckets: 기준 시각부터 거슬러 올라갈 버킷 수 (최대 60)
+    - user: 해당 사용자의 버킷별 호출 수를 함께 조회 (전체 사용자별 집계는 반환하지 않음)
+    """
+    try:
+        resolution = request.args.get('resolution', 'minute')
+        if resolution not in rollups.RESOLUTIONS:
+            return jsonify({"status": "error", "message": "resolution은 minute 또는 hour만 지원합니다"}), 400
+        at = request.args.get('at')
+        at = datetime.fromisoformat(at) if at else datetime.now()
+        count = max(1, min(int(request.args.get('buckets', 1)), STATS_MAX_BUCKETS))
+        user = request.args.get('user') or None
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"잘못된 파라미터입니다: {str(e)}"}), 400
+    
+    try:
+        step = timedelta(minutes=1) if resolution == 'minute' else timedelta(hours=1)
+        redis_client = get_redis_readonly_connection()
+        data = [rollups.read_rollup(redis_client, resolution, rollups.bucket_of(at - step * i, resolution), user)
+                for i in range(count)]
+        redis_client.close()
+        return jsonify({"status": "success", "resolution": resolution, "data": data})
+    except Exception as e:
+        logger.error(f"집계 조회 오류: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 # 메트릭 엔드포인트
 @app.route('/metrics')
 def metrics_endpoint():
     return generate_latest(), 200, {'Content-Type': CONTENT_TYPE_LATEST}
 
+# Admission control: 부하 차단(load shedding) 및 Rate limit
+# 주의: log_request_info보다 먼저 등록되어야 거부된 요청이 Redis/DB 비용을 발생시키지 않음
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+MAX_INFLIGHT_REQUESTS = int(os.getenv('MAX_INFLIGHT_REQUESTS', '64'))
+ADMISSION_EXEMPT_PATHS = ('/metrics',)
+
+# Rate limiter는 요청마다 연결/ping하지 않도록 장기 Redis 클라이언트(connection pool) 사용
+rate_limiter = RateLimiter(shared_redis_client)
+inflight_lock = threading.Lock()
+inflight_count = 0
+
+def too_many_requests(message, retry_after, status=429):
+    response = jsonify({"status": "error", "message": message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+@app.before_request
+def admission_control():
+    global inflight_count
+    if request.method == 'OPTIONS' or request.path in ADMISSION_EXEMPT_PATHS:
+        return None
+    # 여기서 거부되면 log_request_info가 실행되지 않으므로 응답 메트릭용 시작 시각을 먼저 기록
+    request.start_time = datetime.now()
+    
+    # 처리 중인 요청이 임계치를 넘으면 즉시 거부
+    with inflight_lock:
+        if inflight_count >= MAX_INFLIGHT_REQUESTS:
+            shed = True
+        else:
+            shed = False
+            inflight_count += 1
+            INFLIGHT_REQUESTS.set(inflight_count)
+    if shed:
+        SHED_REQUESTS.labels(endpoint=request.path).inc()
+        logger.warning(f"부하 차단: {request.method} {request.path} (처리 중 요청 {inflight_count}개)")
+        request.admission_rejected = 'shed'
+        return too_many_requests("서버가 혼잡합니다. 잠시 후 다시 시도하세요", 1, status=503)
+    request.inflight_counted = True
+    
+    if not RATE_LIMIT_ENABLED:
+        return None
+    
+    # 세션 사용자 또는 클라이언트 IP 기준으로 라우트 클래스별 토큰 버킷 적용
+    route_class = classify_route(request.method, request.path)
+    identity = f"user:{session['user_id']}" if 'user_id' in session else f"ip:{request.remote_addr}"
+    try:
+        # Redis 장애 시 fail-open (breaker가 열려 있으면 Redis 호출 생략)
+        if redis_breaker.is_open():
+            return None
+        with low_value_scope():
+            retry_after = redis_breaker.call(rate_limiter.check, identity, route_class)
+    except Exception as e:
+        logger.debug(f"Rate limit 확인 실패 (허용): {str(e)}")
+        return None
+    if retry_after:
+        logger.info(f"Rate limit 초과: {identity} {route_class} (Retry-After: {retry_after}초)")
+        request.admission_rejected = 'rate_limited'
+        return too_many_requests("요청이 너무 많습니다. 잠시 후 다시 시도하세요", retry_after)
+    return None
+
+@app.teardown_request
+def release_inflight(exception=None):
+    global inflight_count
+    if getattr(request, 'inflight_counted', False):
+        with inflight_lock:
+            inflight_count -= 1
+            INFLIGHT_REQUESTS.set(inflight_count)
+
 # 요청 로깅 및 메트릭 미들웨어
 @app.before_request
 def log_request_info():
@@ -927,11 +1467,12 @@ def log_request_info():
     
     # 활성 연결 수 업데이트
     try:
-        redis_client = get_redis_connection()
-        active_requests_key = "active_requests"
-        redis_client.incr(active_requests_key)
-        redis_client.expire(active_requests_key, 300)  # 5분 TTL
-        redis_client.close()
+        with low_value_scope():
+            redis_client = get_redis_connection()
+            active_requests_key = "active_requests"
+            redis_client.incr(active_requests_key)
+            redis_client.expire(active_requests_key, 300)  # 5분 TTL
+            redis_client.close()
     except Exception as e:
         logger.debug(f"활성 요청 수 업데이트 실패: {str(e)}")
 
@@ -957,23 +1498,38 @@ def log_response_info(response):
         logger.info(f"요청 ID: {request_id}")
         logger.info(f"응답 상태: {response.status_code}")
         logger.info(f"응답 시간: {response_time:.3f}초")
-        logger.info(f"응답 크기: {response.content_length or len(response.get_data())} bytes")
+        # admission control에서 거부된 요청(429/503)도 API 통계에 기록
+        rejected = getattr(request, 'admission_rejected', None)
+        if rejected:
+            async_log_api_stats(request.path, request.method, rejected, session.get('username', 'unknown'))
+        # 스트리밍 응답은 get_data()가 전체 본문을 메모리에 올리므로 크기 계산 생략
+        if response.is_streamed:
+            logger.info("응답 크기: streamed")
+        else:
+            logger.info(f"응답 크기: {response.content_length or len(response.get_data())} bytes")
         
         # 느린 요청 경고
         if response_time > 2.0:
             logger.warning(f"느린 요청 감지! {request.method} {request.path} - {response_time:.3f}초")
         
-        # 활성 연결 수 감소
-        try:
-            redis_client = get_redis_connection()
-            redis_client.decr("active_requests")
-            redis_client.close()
-        except Exception as e:
-            logger.debug(f"활성 요청 수 감소 실패: {str(e)}")
+        # 활성 연결 수 감소 (log_request_info에서 증가시킨 요청만, admission control에서 거부된 요청 제외)
+        if hasattr(request, 'request_id'):
+            try:
+                with low_value_scope():
+                    redis_client = get_redis_connection()
+                    redis_client.decr("active_requests")
+                    redis_client.close()
+            except Exception as e:
+                logger.debug(f"활성 요청 수 감소 실패: {str(e)}")
     
     logger.info("=== 요청 완료 ===")
     return response
 
 if __name__ == '__main__':
     initialize_opentelemetry()
-    app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
+    if SERVER_MODE == 'gevent':
+        from gevent.pywsgi import WSGIServer
+        logger.info("gevent WSGI 서버 시작: 0.0.0.0:5000")
+        WSGIServer(('0.0.0.0', 5000), app, log=None).serve_forever()
+    else:
+        app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
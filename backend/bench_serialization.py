@@ -0,0 +1,105 @@
+# JSON 직렬화 마이크로벤치마크
+# 실제 메시지 목록 / Redis 로그 / Kafka 레코드 형태의 payload로 backend별 처리 시간을 비교한다.
+# 사용법: python bench_serialization.py [반복횟수]
+import sys
+import timeit
+from datetime import datetime, timedelta
+from email.utils import format_datetime
+
+import serialization
+
+
+def http_date_encoder(obj):
+    """Flask DefaultJSONProvider와 같은 형식(HTTP date)으로 datetime 직렬화"""
+    if isinstance(obj, datetime):
+        return format_datetime(obj, usegmt=False)
+    return serialization.default_encoder(obj)
+
+
+def build_payloads():
+    now = datetime.now()
+    # GET /messages 응답 (JOIN 결과 row dict 1000개)
+    messages = {
+        "status": "success",
+        "data": [
+            {
+                "id": i,
+                "message": f"샘플 메시지 {i} - 안녕하세요 AKS 데모입니다",
+                "created_at": now - timedelta(minutes=i),
+                "username": f"user{i % 20}"
+            }
+            for i in range(1000)
+        ]
+    }
+    # log_to_redis 로그 엔트리
+    redis_log = {
+        'timestamp': now.isoformat(),
+        'action': 'message_search',
+        'details': "Search query: 'hello', user_filter: '', results: 42",
+        'source': 'aks-demo-backend',
+        'pid': 1
+    }
+    # async_log_api_stats Kafka 레코드
+    kafka_record = {
+        'timestamp': now.isoformat(),
+        'endpoint': '/messages',
+        'method': 'GET',
+        'status': 'success',
+        'user_id': 'user1',
+        'message': "user1가 GET /messages 호출 (success)",
+        'source': 'aks-demo-backend',
+        'thread_id': 140245123456768,
+        'pid': 1
+    }
+    return messages, redis_log, kafka_record
+
+
+def bench(codec, number):
+    messages, redis_log, kafka_record = build_payloads()
+    # get_redis_logs는 최대 100개 엔트리를 디코딩
+    encoded_logs = [codec.dumps(redis_log) for _ in range(100)]
+    encoded_record = codec.dumps_bytes(kafka_record)
+
+    cases = {
+        'http /messages (1000 rows)': lambda: codec.dumps_bytes(messages, default=http_date_encoder, sort_keys=True),
+        'redis log encode': lambda: codec.dumps(redis_log),
+        'redis logs decode (100)': lambda: [codec.loads(log) for log in encoded_logs],
+        'kafka record encode': lambda: codec.dumps_bytes(kafka_record),
+        'kafka record decode': lambda: codec.loads(encoded_record),
+    }
+
+    results = {}
+    if codec.name == serialization.codec.name:
+        # api-logs 바이너리 스키마 (KAFKA_LOG_FORMAT=binary)
+        encoded_binary = serialization.encode_api_log_binary(kafka_record)
+        cases['kafka record encode (binary)'] = lambda: serialization.encode_api_log_binary(kafka_record)
+        cases['kafka record decode (binary)'] = lambda: serialization.api_log_deserializer(encoded_binary)
+        print(f"api-logs record size: json={len(encoded_record)}B, binary={len(encoded_binary)}B")
+
+    for name, func in cases.items():
+        # 큰 payload는 반복 횟수를 줄임
+        n = max(1, number // 100) if name.startswith('http') else number
+        elapsed = min(timeit.repeat(func, number=n, repeat=3))
+        results[name] = elapsed / n * 1e6
+    return results
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    codecs = serialization.available_codecs()
+    results = {codec.name: bench(codec, number) for codec in codecs}
+
+    baseline = results['json']
+    print(f"{'payload':<30}" + ''.join(f"{name:>14}" for name in results) + f"{'speedup':>10}")
+    for case in results[serialization.codec.name]:
+        if case not in baseline:
+            print(f"{case:<30}{results[serialization.codec.name][case]:>11.2f} us")
+            continue
+        row = f"{case:<30}" + ''.join(f"{results[name][case]:>11.2f} us" for name in results)
+        fastest = min(results[name][case] for name in results)
+        row += f"{baseline[case] / fastest:>9.1f}x"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
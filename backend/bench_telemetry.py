@@ -0,0 +1,167 @@
+# 트레이싱 계측 오버헤드 벤치마크
+# 실제 app을 app.test_client()로 호출하여 (로그인된 GET /messages) 설정별 요청당 추가 시간을 측정한다.
+# 운영과 같은 샘플러(telemetry.build_sampler)와 span processor, Flask/Redis/Logging 자동계측을 사용하고,
+# 외부 의존성만 대체한다: Redis -> fakeredis, MariaDB -> 고정 행을 반환하는 연결, Kafka 통계 -> 생략
+# (DB 연결을 대체하므로 MySQL 자동계측 span은 측정에 포함되지 않음)
+#   off          : 트레이싱 비활성 (계측 없음)
+#   sampled      : 기본 설정 (비율 샘플링 + 저가치 Redis span 생략)
+#   sampled+redis: 비율 샘플링, 저가치 Redis span도 생성
+#   full         : 항상 샘플링 (기존 설정)
+# 모드마다 별도 프로세스에서 실행 (Flask는 첫 요청 이후 계측 hook 추가를 허용하지 않음)
+# 사용법: python bench_telemetry.py [요청수]
+import logging
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+import fakeredis
+import redis
+from opentelemetry.instrumentation.flask import FlaskInstrumentor
+from opentelemetry.instrumentation.logging import LoggingInstrumentor
+from opentelemetry.instrumentation.redis import RedisInstrumentor
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.sdk.trace.sampling import ALWAYS_ON
+
+import telemetry
+
+MODES = ('off', 'sampled', 'sampled+redis', 'full')
+ROUNDS = 3  # 모드를 번갈아 ROUNDS번 실행하고 가장 빠른 결과 사용 (fakeredis 호출 시간의 편차 완화)
+MESSAGE_COUNT = 20
+USER_COUNT = 5
+REDIS_SERVER = fakeredis.FakeServer()
+
+
+class BenchRedis(fakeredis.FakeRedis):
+    """host/port 등 연결 설정은 무시하고 하나의 fakeredis 서버에 연결 (redis.Redis 하위 클래스라 자동계측 적용)"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, server=REDIS_SERVER, **kwargs)
+
+
+class NullExporter(SpanExporter):
+    def __init__(self):
+        self.exported = 0
+
+    def export(self, spans):
+        self.exported += len(spans)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    """MariaDB 대신 SQL에 맞는 고정 행을 반환하는 풀 연결"""
+    reused = False
+
+    def __init__(self, messages, users):
+        self._messages = messages
+        self._users = users
+
+    def execute(self, sql, params=()):
+        return FakeCursor(self._users if 'FROM users' in sql else self._messages)
+
+    def close(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+def load_app():
+    """외부 의존성을 대체한 상태로 app을 import"""
+    os.environ['SERVER_MODE'] = 'threaded'
+    # 같은 사용자의 반복 요청이 rate limit에 걸리지 않도록
+    os.environ.setdefault('RATE_LIMIT_READ', '1000000/1000000')
+    # app의 모든 Redis 클라이언트(공유/요청별)를 하나의 fakeredis 서버로 연결
+    redis.Redis = BenchRedis
+    import app as backend_app
+
+    now = datetime.now()
+    messages = [(i, f"message {i}", now - timedelta(seconds=i), i % USER_COUNT + 1) for i in range(MESSAGE_COUNT)]
+    users = [(user_id, f"user{user_id}") for user_id in range(1, USER_COUNT + 1)]
+    backend_app.db_access._get_connection = lambda readonly=False: FakeConnection(messages, users)
+    backend_app.async_log_api_stats = lambda *args: None
+    # 요청 로그는 그대로 생성하되 출력만 생략
+    logging.getLogger().handlers = [logging.NullHandler()]
+    return backend_app
+
+
+def instrument(app, mode):
+    """setup_opentelemetry()/initialize_opentelemetry()와 같은 샘플러/processor/계측을 적용"""
+    exporter = NullExporter()
+    sampler = ALWAYS_ON if mode == 'full' else telemetry.build_sampler()
+    provider = TracerProvider(sampler=sampler)
+    provider.add_span_processor(BatchSpanProcessor(exporter, max_queue_size=65536))
+    provider.add_span_processor(telemetry.KeepErrorsAndSlowSpanProcessor(exporter))
+    telemetry.TRACE_LOW_VALUE_REDIS = mode in ('sampled+redis', 'full')
+    RedisInstrumentor().instrument(tracer_provider=provider)
+    LoggingInstrumentor().instrument(tracer_provider=provider)
+    FlaskInstrumentor().instrument_app(app, tracer_provider=provider)
+    return provider, exporter
+
+
+def bench(mode, requests):
+    """현재 프로세스에서 mode로 계측한 app에 requests개 요청 -> (us/request, spans/request)"""
+    backend_app = load_app()
+    provider = exporter = None
+    if mode != 'off':
+        provider, exporter = instrument(backend_app.app, mode)
+    client = backend_app.app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['username'] = 'user1'
+    # 워밍업 (user directory 캐시 등)
+    warmup = min(requests, 100)
+    for _ in range(warmup):
+        client.get('/messages')
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get('/messages')
+        assert response.status_code == 200, response.get_data(as_text=True)
+    elapsed = time.perf_counter() - start
+    if provider is not None:
+        provider.shutdown()
+    spans = exporter.exported if exporter is not None else 0
+    return elapsed / requests * 1e6, spans / (warmup + requests)
+
+
+def run_mode(mode, requests):
+    output = subprocess.run([sys.executable, __file__, str(requests), mode],
+                            check=True, capture_output=True, text=True).stdout
+    value, spans = output.strip().splitlines()[-1].split()
+    return float(value), float(spans)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    os.environ.setdefault('OTEL_TRACES_SAMPLE_RATIO', str(telemetry.DEFAULT_SAMPLE_RATIO))
+    if len(sys.argv) > 2:
+        print(*bench(sys.argv[2], requests))
+        return
+    print(f"sample ratio={os.environ['OTEL_TRACES_SAMPLE_RATIO']}, requests={requests}")
+
+    runs = {mode: [] for mode in MODES}
+    for _ in range(ROUNDS):
+        for mode in MODES:
+            runs[mode].append(run_mode(mode, requests))
+    results = {mode: min(mode_runs) for mode, mode_runs in runs.items()}
+    baseline = results['off'][0]
+    print(f"{'mode':<16}{'us/request':>12}{'overhead':>12}{'spans/request':>16}")
+    for mode, (value, spans) in results.items():
+        print(f"{mode:<16}{value:>12.2f}{value - baseline:>12.2f}{spans:>16.2f}")
+
+
+if __name__ == '__main__':
+    main()
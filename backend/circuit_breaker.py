@@ -0,0 +1,129 @@
+# 외부 의존성(MariaDB, Redis, Kafka)용 Circuit Breaker
+# 연속 실패가 임계치를 넘으면 OPEN 상태가 되어 recovery_timeout 동안 호출을 즉시 거부하고,
+# 이후 HALF_OPEN 상태에서 제한된 수의 probe 호출로 복구 여부를 확인한다.
+import os
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+# Prometheus 메트릭 (0=closed, 1=half_open, 2=open)
+BREAKER_STATE = Gauge('circuit_breaker_state', 'Circuit breaker state (0=closed, 1=half_open, 2=open)', ['dependency'])
+BREAKER_FAILURES = Counter('circuit_breaker_failures_total', 'Failures recorded by circuit breaker', ['dependency'])
+BREAKER_REJECTIONS = Counter('circuit_breaker_rejections_total', 'Calls rejected by open circuit breaker', ['dependency'])
+BREAKER_TRANSITIONS = Counter('circuit_breaker_transitions_total', 'Circuit breaker state transitions', ['dependency', 'state'])
+
+
+class CircuitOpenError(Exception):
+    """Circuit breaker가 열려 있어 호출이 거부됨"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} circuit breaker가 열려 있습니다 ({retry_after:.1f}초 후 재시도)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+    _STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_threshold=None, recovery_timeout=None, half_open_max_calls=1):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv('BREAKER_FAILURE_THRESHOLD', '5'))
+        self.recovery_timeout = recovery_timeout or float(os.getenv('BREAKER_RECOVERY_TIMEOUT', '30'))
+        self.half_open_max_calls = half_open_max_calls
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        BREAKER_STATE.labels(dependency=name).set(0)
+
+    @property
+    def state(self):
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _set_state(self, state):
+        # lock을 잡은 상태에서 호출
+        if self._state != state:
+            self._state = state
+            BREAKER_STATE.labels(dependency=self.name).set(self._STATE_VALUES[state])
+            BREAKER_TRANSITIONS.labels(dependency=self.name, state=state).inc()
+
+    def _refresh_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._set_state(self.HALF_OPEN)
+            self._half_open_calls = 0
+
+    def _retry_after(self):
+        return max(0.0, self.recovery_timeout - (time.monotonic() - self._opened_at))
+
+    def is_open(self):
+        """probe 슬롯을 소비하지 않고 호출이 거부될 상태인지 확인 (선택적 의존성의 fail-fast용)"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.HALF_OPEN:
+                return self._half_open_calls >= self.half_open_max_calls
+            return self._state == self.OPEN
+
+    def _acquire(self):
+        """(호출 허용 여부, half-open probe 슬롯을 사용했는지)"""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True, False
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True, True
+        BREAKER_REJECTIONS.labels(dependency=self.name).inc()
+        return False, False
+
+    def allow_request(self):
+        return self._acquire()[0]
+
+    def _release_probe(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        BREAKER_FAILURES.labels(dependency=self.name).inc()
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state(self.OPEN)
+
+    def call(self, func, *args, **kwargs):
+        allowed, probe = self._acquire()
+        if not allowed:
+            with self._lock:
+                retry_after = self._retry_after()
+            raise CircuitOpenError(self.name, retry_after)
+        succeeded = None
+        try:
+            result = func(*args, **kwargs)
+            succeeded = True
+            return result
+        except Exception:
+            succeeded = False
+            raise
+        finally:
+            if succeeded:
+                self.record_success()
+            elif succeeded is False:
+                self.record_failure()
+            elif probe:
+                # 취소(GreenletExit, gevent Timeout, KeyboardInterrupt 등)는 의존성의 성공/실패로 보지 않고
+                # probe 슬롯만 반납하여 breaker가 HALF_OPEN에 멈추지 않게 함
+                self._release_probe()
@@ -0,0 +1,291 @@
+# 메시지/사용자 SQL을 한 곳에서 관리하는 데이터 접근 계층
+# - ConnectionPool: 호스트별 유휴 연결을 재사용 (요청마다 TCP 연결/인증을 반복하지 않음)
+# - 서버 측 prepared statement: 풀 연결마다 SQL 문자열별 prepared cursor를 캐시하여
+#   같은 연결에서 반복 실행할 때 서버가 SQL을 다시 파싱하지 않음 (COM_STMT_EXECUTE)
+# - 결과는 행마다 dict를 만들지 않고 namedtuple 행으로 반환 (JSON용 dict 변환은 응답 시점에만)
+# - 쿼리별 실행 시간: db_query_duration_seconds{query}
+import collections
+import heapq
+import logging
+import threading
+import time
+
+from mysql.connector import errors
+from prometheus_client import Counter, Gauge, Histogram
+
+logger = logging.getLogger(__name__)
+
+DB_QUERY_DURATION = Histogram('db_query_duration_seconds', 'Data-access query duration', ['query'])
+DB_STATEMENT_CACHE = Counter('db_prepared_statement_cache_total',
+                             'Prepared statement lookups on pooled connections', ['result'])
+DB_POOL_IDLE = Gauge('db_pool_idle_connections', 'Idle pooled MariaDB connections', ['host'])
+
+MessageRow = collections.namedtuple('MessageRow', 'id message created_at user_id')
+UserRow = collections.namedtuple('UserRow', 'id username password')
+
+
+class PooledConnection:
+    """풀에서 빌린 MariaDB 연결 (close()는 연결을 닫지 않고 풀에 반납)"""
+    __slots__ = ('raw', 'host', 'pool', 'reused', 'last_used', '_statements')
+
+    def __init__(self, raw, host, pool):
+        # 재사용되는 연결이 이전 읽기 트랜잭션의 스냅샷에 머물지 않도록 autocommit 사용
+        raw.autocommit = True
+        self.raw = raw
+        self.host = host
+        self.pool = pool
+        self.reused = False
+        self.last_used = time.monotonic()
+        self._statements = collections.OrderedDict()  # sql -> (sql, prepared cursor)
+
+    def cursor(self, *args, **kwargs):
+        return self.raw.cursor(*args, **kwargs)
+
+    def execute(self, sql, params=()):
+        """sql을 이 연결의 prepared cursor로 실행하고 cursor를 반환"""
+        entry = self._statements.get(sql)
+        if entry is None:
+            DB_STATEMENT_CACHE.labels(result='miss').inc()
+            entry = self._statements[sql] = (sql, self.raw.cursor(prepared=True))
+            if len(self._statements) > self.pool.statement_cache_size:
+                _, (_, evicted) = self._statements.popitem(last=False)
+                evicted.close()  # 서버의 prepared statement 해제
+        else:
+            DB_STATEMENT_CACHE.labels(result='hit').inc()
+            self._statements.move_to_end(sql)
+        # cursor는 이전과 같은 문자열 객체(is 비교)일 때만 prepare를 생략하므로 캐시된 sql 객체로 실행
+        cached_sql, cursor = entry
+        cursor.execute(cached_sql, tuple(params))
+        return cursor
+
+    def close(self):
+        self.pool.release(self)
+
+    def discard(self):
+        """오류가 났거나 결과를 다 읽지 않은 연결은 풀에 반납하지 않고 닫음"""
+        try:
+            self.raw.close()
+        except Exception:
+            pass
+        self._statements.clear()
+
+
+class ConnectionPool:
+    """호스트별 유휴 연결 풀 (동시 연결 수는 제한하지 않고 유휴 연결만 max_idle개까지 보관)"""
+
+    def __init__(self, connect, max_idle=8, idle_timeout=60.0, statement_cache_size=64):
+        """connect: host를 받아 새 MariaDB 연결을 반환하는 함수"""
+        self._connect = connect
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.statement_cache_size = statement_cache_size
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def acquire(self, host):
+        expired = []
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(host, [])
+            connection = None
+            while idle:
+                candidate = idle.pop()  # 가장 최근에 반납된 연결부터 사용
+                if now - candidate.last_used < self.idle_timeout:
+                    connection = candidate
+                    break
+                expired.append(candidate)
+            DB_POOL_IDLE.labels(host=host).set(len(idle))
+        for stale in expired:
+            stale.discard()
+        if connection is not None:
+            connection.reused = True
+            return connection
+        return PooledConnection(self._connect(host), host, self)
+
+    def release(self, connection):
+        connection.last_used = time.monotonic()
+        with self._lock:
+            idle = self._idle.setdefault(connection.host, [])
+            if len(idle) < self.max_idle:
+                idle.append(connection)
+                DB_POOL_IDLE.labels(host=connection.host).set(len(idle))
+                return
+        connection.discard()
+
+
+# IN (...) 한 번에 넣는 최대 값 수 (MariaDB 자리표시자 상한 65535보다 충분히 작게)
+IN_LIST_CHUNK_SIZE = 1024
+
+
+def _in_chunks(values, chunk_size=IN_LIST_CHUNK_SIZE):
+    """IN (...) 자리표시자와 파라미터를 chunk_size개 이하 묶음으로 yield (빈 목록이면 아무것도 yield하지 않음)
+    목록 길이마다 SQL 문자열이 달라지면 연결별 prepared statement 캐시가 계속 교체되므로
+    묶음 길이를 2의 거듭제곱으로 올려 마지막 값을 반복 (IN 조건이므로 결과는 같음)"""
+    values = list(values)
+    for start in range(0, len(values), chunk_size):
+        chunk = values[start:start + chunk_size]
+        size = 1 << (len(chunk) - 1).bit_length()
+        chunk.extend(chunk[-1:] * (size - len(chunk)))
+        yield ', '.join(['%s'] * size), chunk
+
+
+# 서버/연결 장애로 보는 오류 (IntegrityError 등 요청 자체의 오류는 breaker 실패로 세지 않음)
+SERVER_ERRORS = (errors.InterfaceError, errors.OperationalError)
+
+
+class DataAccess:
+    def __init__(self, get_connection, breaker=None):
+        """get_connection(readonly=...): PooledConnection을 반환하는 함수 (복제본 라우팅/breaker 포함)
+        breaker: 연결을 받은 뒤의 쿼리 실행 결과도 기록할 CircuitBreaker
+        (연결은 되지만 쿼리가 실패/타임아웃되는 서버에서도 breaker가 열리도록)"""
+        self._get_connection = get_connection
+        self._breaker = breaker
+
+    def _record(self, succeeded):
+        if self._breaker is None:
+            return
+        if succeeded:
+            self._breaker.record_success()
+        else:
+            self._breaker.record_failure()
+
+    def _run(self, name, sql, params=(), readonly=False, fetch=True, idempotent=True):
+        """sql을 실행하고 fetch=True 이면 전체 행(tuple 목록)을 반환"""
+        with DB_QUERY_DURATION.labels(query=name).time():
+            for attempt in (1, 2):
+                connection = self._get_connection(readonly=readonly)
+                try:
+                    cursor = connection.execute(sql, params)
+                    rows = cursor.fetchall() if fetch else None
+                except SERVER_ERRORS as e:
+                    connection.discard()
+                    # 풀에 있는 동안 서버에서 끊긴 연결이면 새 연결로 한 번만 재시도 (breaker 실패로 세지 않음)
+                    if attempt == 1 and connection.reused and idempotent:
+                        logger.debug(f"끊긴 풀 연결로 재시도: {name}: {str(e)}")
+                        continue
+                    self._record(False)
+                    raise
+                except Exception:
+                    connection.discard()
+                    raise
+                connection.close()
+                self._record(True)
+                return rows
+
+    # 사용자
+    def find_login_user(self, username):
+        rows = self._run('find_login_user', "SELECT id, username, password FROM users WHERE username = %s", (username,))
+        return UserRow._make(rows[0]) if rows else None
+
+    def username_exists(self, username):
+        return bool(self._run('username_exists', "SELECT 1 FROM users WHERE username = %s", (username,)))
+
+    def create_user(self, username, password_hash):
+        rows = self._run('create_user', "INSERT INTO users (username, password) VALUES (%s, %s) RETURNING id",
+                         (username, password_hash), idempotent=False)
+        return rows[0][0]
+
+    def users_by_ids(self, user_ids, readonly=True):
+        rows = []
+        for placeholders, params in _in_chunks(user_ids):
+            rows.extend(self._run('users_by_ids', f"SELECT id, username FROM users WHERE id IN ({placeholders})",
+                                  params, readonly=readonly))
+        return rows
+
+    def users_by_usernames(self, usernames, readonly=True):
+        rows = []
+        for placeholders, params in _in_chunks(usernames):
+            rows.extend(self._run('users_by_usernames',
+                                  f"SELECT id, username FROM users WHERE username IN ({placeholders})",
+                                  params, readonly=readonly))
+        return rows
+
+    def users_matching(self, fragment, readonly=False):
+        """유저명 부분 일치 [(id, username)]"""
+        return self._run('users_matching', "SELECT id, username FROM users WHERE username LIKE %s",
+                         (f"%{fragment}%",), readonly=readonly)
+
+    # 메시지
+    def insert_message(self, user_id, message):
+        """(id, created_at) 반환"""
+        rows = self._run('insert_message',
+                         "INSERT INTO messages (user_id, message) VALUES (%s, %s) RETURNING id, created_at",
+                         (user_id, message), idempotent=False)
+        return rows[0]
+
+    def insert_unowned_message(self, message, created_at):
+        self._run('insert_unowned_message', "INSERT INTO messages (message, created_at) VALUES (%s, %s)",
+                  (message, created_at), fetch=False, idempotent=False)
+
+    def list_messages(self, text=None, user_ids=None, since=None, until=None, readonly=False):
+        """조건에 맞는 메시지를 최신 순으로 [MessageRow] 반환 (user_ids가 빈 목록이면 조회 없이 [])"""
+        conditions, params = [], []
+        if text is not None:
+            conditions.append("message LIKE %s")
+            params.append(f"%{text}%")
+        # 기간을 주면 created_at 월별 파티션 pruning 적용
+        if since is not None:
+            conditions.append("created_at >= %s")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < %s")
+            params.append(until)
+
+        def select(extra_conditions=(), extra_params=()):
+            where_conditions = conditions + list(extra_conditions)
+            where = f"WHERE {' AND '.join(where_conditions)} " if where_conditions else ""
+            sql = f"SELECT id, message, created_at, user_id FROM messages {where}ORDER BY created_at DESC"
+            return list(map(MessageRow._make, self._run('list_messages', sql, params + list(extra_params),
+                                                        readonly=readonly)))
+
+        if user_ids is None:
+            return select()
+        # user_id 묶음별 결과(각각 최신 순)를 최신 순으로 병합
+        results = [select([f"user_id IN ({placeholders})"], values) for placeholders, values in _in_chunks(user_ids)]
+        if len(results) == 1:
+            return results[0]
+        return list(heapq.merge(*results, key=lambda row: row.created_at, reverse=True))
+
+    def messages_after(self, last_id, user_id=None, limit=500, readonly=False):
+        """last_id 이후 메시지를 id 순으로 최대 limit개 [MessageRow]"""
+        if user_id is None:
+            sql, params = "SELECT id, message, created_at, user_id FROM messages WHERE id > %s ORDER BY id LIMIT %s", (last_id, limit)
+        else:
+            sql = "SELECT id, message, created_at, user_id FROM messages WHERE id > %s AND user_id = %s ORDER BY id LIMIT %s"
+            params = (last_id, user_id, limit)
+        return list(map(MessageRow._make, self._run('messages_after', sql, params, readonly=readonly)))
+
+    def export_messages(self, after_id=None, user_id=None, since=None, until=None, batch_size=1000, readonly=False):
+        """(id, user_id, message, created_at) 행을 id 순으로 batch_size개씩 yield (서버에서 배치 단위로 읽음)
+        유저명은 다른 조회와 같이 users JOIN 없이 호출자가 user directory에서 배치 단위로 붙임"""
+        conditions, params = [], []
+        for condition, value in (("id > %s", after_id), ("user_id = %s", user_id),
+                                 ("created_at >= %s", since), ("created_at < %s", until)):
+            if value is not None:
+                conditions.append(condition)
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        sql = f"SELECT id, user_id, message, created_at FROM messages {where}ORDER BY id"
+
+        connection = self._get_connection(readonly=readonly)
+        exhausted = False
+        try:
+            try:
+                with DB_QUERY_DURATION.labels(query='export_messages').time():
+                    cursor = connection.execute(sql, params)
+            except SERVER_ERRORS:
+                self._record(False)
+                raise
+            self._record(True)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    return
+                yield rows
+        finally:
+            # 중간에 끊긴 스트림은 읽지 않은 결과가 남아 있으므로 연결을 재사용하지 않음
+            if exhausted:
+                connection.close()
+            else:
+                connection.discard()
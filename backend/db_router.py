@@ -0,0 +1,92 @@
+# MariaDB 읽기 복제본 라우팅
+# 읽기 전용 쿼리를 복제본 호스트로 라운드로빈 분산하고,
+# 연결 실패(circuit breaker)나 복제 지연이 허용치를 넘은 복제본은 건너뛴다.
+import itertools
+import logging
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+from circuit_breaker import CircuitBreaker
+
+DB_ROUTED_CONNECTIONS = Counter('db_routed_connections_total', 'MariaDB connections by routing target', ['target'])
+DB_REPLICA_LAG = Gauge('db_replica_lag_seconds', 'Last observed MariaDB replica lag', ['host'])
+
+logger = logging.getLogger(__name__)
+
+
+class _Replica:
+    def __init__(self, host):
+        self.host = host
+        self.breaker = CircuitBreaker(f"mariadb_replica:{host}")
+        self.lag = None
+        self.lag_checked_at = 0.0
+
+
+class ReplicaRouter:
+    def __init__(self, hosts, connect, max_lag, lag_check_interval):
+        """
+        hosts: 복제본 호스트 목록
+        connect: host를 받아 MariaDB 연결을 반환하는 함수
+        max_lag: 허용 복제 지연(초)
+        lag_check_interval: 복제본별 지연 확인 주기(초)
+        """
+        self._replicas = [_Replica(host) for host in hosts]
+        self._connect = connect
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self._cycle = itertools.cycle(self._replicas) if self._replicas else None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self._replicas)
+
+    def _next(self):
+        with self._lock:
+            return next(self._cycle)
+
+    def _lag_ok(self, replica):
+        return replica.lag is not None and replica.lag <= self.max_lag
+
+    def _check_lag(self, replica, connection):
+        cursor = connection.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW SLAVE STATUS")
+            status = cursor.fetchone()
+        finally:
+            cursor.close()
+        # 복제 설정이 없는 호스트(프록시 등)는 지연 0으로 간주, 복제 중단(NULL)은 사용 불가
+        replica.lag = 0 if status is None else status.get('Seconds_Behind_Master')
+        replica.lag_checked_at = time.monotonic()
+        DB_REPLICA_LAG.labels(host=replica.host).set(-1 if replica.lag is None else replica.lag)
+
+    def connect(self):
+        """사용 가능한 복제본 연결을 반환, 없으면 None (호출자가 primary로 fallback)"""
+        for _ in range(len(self._replicas)):
+            replica = self._next()
+            lag_due = time.monotonic() - replica.lag_checked_at >= self.lag_check_interval
+            if replica.breaker.is_open() or (not lag_due and not self._lag_ok(replica)):
+                continue
+            try:
+                connection = replica.breaker.call(self._connect, replica.host)
+            except Exception as e:
+                logger.warning(f"MariaDB 복제본 연결 실패: {replica.host}: {str(e)}")
+                continue
+
+            if lag_due:
+                try:
+                    self._check_lag(replica, connection)
+                except Exception as e:
+                    logger.warning(f"MariaDB 복제본 지연 확인 실패: {replica.host}: {str(e)}")
+                    replica.lag = None
+                    replica.lag_checked_at = time.monotonic()
+                if not self._lag_ok(replica):
+                    logger.warning(f"MariaDB 복제본 지연 초과로 제외: {replica.host} (lag={replica.lag})")
+                    connection.close()
+                    continue
+
+            DB_ROUTED_CONNECTIONS.labels(target='replica').inc()
+            return connection
+        return None
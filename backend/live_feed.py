@@ -0,0 +1,137 @@
+# 새 메시지 실시간 전달 (Server-Sent Events)
+# save_message가 Redis 채널(messages:new)에 발행하면 프로세스당 구독 루프 하나가 받아
+# 연결된 SSE 클라이언트 큐로 분배한다. 클라이언트마다 Redis 연결/구독을 만들지 않는다.
+# 재연결 시 Last-Event-ID 이후 메시지는 호출자가 항상 DB(id 인덱스)에서 보충한다.
+# (발행 실패나 id 역순 도착으로 pub/sub 이벤트에는 빈틈이 있을 수 있으므로 보충에 쓰지 않음)
+import logging
+import queue
+import threading
+import time
+
+from prometheus_client import Counter, Gauge
+
+import serialization
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_CHANNEL = 'messages:new'
+
+SSE_CLIENTS = Gauge('sse_clients_connected', 'Connected SSE clients in this process')
+SSE_EVENTS = Counter('sse_events_received_total', 'Message events received from Redis pub/sub')
+SSE_DROPPED_CLIENTS = Counter('sse_clients_dropped_total', 'SSE clients disconnected because their queue overflowed')
+
+
+class Subscription:
+    """SSE 클라이언트 하나의 이벤트 큐
+    (큐가 넘치거나 구독이 끊겼던 경우 expired로 표시 -> 연결을 종료해 Last-Event-ID로 재개하게 함)"""
+    __slots__ = ('queue', 'expired')
+
+    def __init__(self, max_size):
+        self.queue = queue.Queue(maxsize=max_size)
+        self.expired = False
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class MessageFeed:
+    def __init__(self, redis_factory, channel=MESSAGE_CHANNEL, client_queue_size=256):
+        self._redis_factory = redis_factory
+        self._channel = channel
+        self._client_queue_size = client_queue_size
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        self._listener = None
+        # 구독 루프의 Redis SUBSCRIBE가 서버에서 확인된 상태 (끊기거나 루프가 종료되면 해제)
+        self._ready = threading.Event()
+
+    def publish(self, redis_client, event):
+        redis_client.publish(self._channel, serialization.dumps_bytes(event))
+
+    def subscribe(self, timeout=5.0):
+        """Redis 채널 구독이 확인될 때까지 기다린 뒤 Subscription 반환
+        (반환 이후 발행된 이벤트는 모두 큐로 전달됨, timeout 안에 확인되지 않으면 TimeoutError)"""
+        subscription = Subscription(self._client_queue_size)
+        with self._lock:
+            self._subscriptions.add(subscription)
+            # 첫 구독자가 생길 때 구독 루프 시작 (구독자가 없으면 루프는 스스로 종료)
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._run, name='message-feed', daemon=True)
+                self._listener.start()
+        SSE_CLIENTS.inc()
+        if not self._ready.wait(timeout):
+            self.unsubscribe(subscription)
+            raise TimeoutError(f"{self._channel} 채널 구독이 {timeout}초 안에 확인되지 않았습니다")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+        SSE_CLIENTS.dec()
+
+    def _has_subscribers(self):
+        with self._lock:
+            if self._subscriptions:
+                return True
+            self._listener = None
+            self._ready.clear()
+            return False
+
+    def _expire_all(self):
+        # 구독이 끊긴 동안의 이벤트는 받을 수 없으므로 모든 클라이언트가 재연결하여 DB에서 보충하게 함
+        self._ready.clear()
+        with self._lock:
+            for subscription in self._subscriptions:
+                subscription.expired = True
+
+    def _dispatch(self, data):
+        try:
+            event = serialization.loads(data)
+        except Exception as e:
+            logger.warning(f"메시지 이벤트 디코딩 실패: {str(e)}")
+            return
+        SSE_EVENTS.inc()
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(event)
+            except queue.Full:
+                # 재연결 시 Last-Event-ID로 보충되므로 밀린 이벤트를 버리고 연결을 끊음
+                if not subscription.expired:
+                    subscription.expired = True
+                    SSE_DROPPED_CLIENTS.inc()
+
+    def _run(self):
+        backoff = 1
+        while True:
+            # 구독자가 없으면 _listener를 비우고 즉시 종료 (이후 subscribe가 새 루프를 시작)
+            if not self._has_subscribers():
+                return
+            pubsub = None
+            try:
+                pubsub = self._redis_factory().pubsub()
+                pubsub.subscribe(self._channel)
+                backoff = 1
+                while True:
+                    if not self._has_subscribers():
+                        return
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message['type'] == 'subscribe':
+                        # 서버가 구독을 확인한 뒤부터 발행된 메시지는 빠짐없이 수신됨
+                        self._ready.set()
+                    elif message['type'] == 'message':
+                        self._dispatch(message['data'])
+            except Exception as e:
+                logger.warning(f"메시지 채널 구독 오류 ({backoff}초 후 재시도): {str(e)}")
+                self._expire_all()
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except Exception:
+                        pass
@@ -0,0 +1,177 @@
+# messages 테이블 파티션 유지보수 작업 (CronJob으로 하루 1회 실행)
+# 1. pmax(MAXVALUE) 파티션을 분할하여 앞으로 PARTITION_MONTHS_AHEAD개월치 월별 파티션을 미리 생성
+# 2. PARTITION_RETENTION_MONTHS보다 오래된 파티션을 gzip NDJSON 파일로 보관한 뒤 DROP
+# 사용법: python partition_maintenance.py [--dry-run]
+import gzip
+import logging
+import os
+import sys
+from datetime import date
+
+import mysql.connector
+
+import serialization
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger('partition_maintenance')
+
+DATABASE = 'testdb'
+TABLE = 'messages'
+MAX_PARTITION = 'pmax'
+MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '12'))
+ARCHIVE_DIR = os.getenv('PARTITION_ARCHIVE_DIR', '/archive')
+ARCHIVE_BATCH_SIZE = 5000
+
+
+def get_connection():
+    return mysql.connector.connect(
+        host=os.getenv('MARIADB_HOST', 'my-mariadb'),
+        user=os.getenv('MARIADB_USER', 'testuser'),
+        password=os.getenv('MARIADB_PASSWORD'),
+        port=3306,
+        database=DATABASE,
+        connect_timeout=int(os.getenv('MARIADB_CONNECT_TIMEOUT', '5'))
+    )
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f"p{month_start.year:04d}{month_start.month:02d}"
+
+
+def unix_timestamp(cursor, month_start):
+    # 파티션 경계와 같은 서버 타임존 기준으로 계산
+    cursor.execute("SELECT UNIX_TIMESTAMP(%s)", (month_start.strftime('%Y-%m-%d 00:00:00'),))
+    return int(cursor.fetchone()[0])
+
+
+def list_partitions(cursor):
+    """(파티션명, 상한 epoch 또는 None(MAXVALUE)) 목록을 경계 순으로 반환"""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION
+        FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (DATABASE, TABLE))
+    return [(name, None if bound == 'MAXVALUE' else int(bound)) for name, bound in cursor.fetchall()]
+
+
+def ensure_future_partitions(connection, months_ahead=MONTHS_AHEAD, dry_run=False):
+    """마지막 월 경계부터 (이번 달 + months_ahead)까지 월별 파티션을 생성"""
+    cursor = connection.cursor()
+    partitions = list_partitions(cursor)
+    if not partitions or partitions[-1][0] != MAX_PARTITION:
+        raise RuntimeError(f"{TABLE} 테이블에 {MAX_PARTITION} 파티션이 없습니다 (db/init.sql 참고)")
+
+    bounds = [bound for _, bound in partitions if bound is not None]
+    last_bound = max(bounds) if bounds else 0
+    target = add_months(date.today().replace(day=1), months_ahead + 1)
+
+    # 마지막 경계가 속한 달부터 이어서 생성
+    if bounds:
+        cursor.execute("SELECT DATE(FROM_UNIXTIME(%s))", (last_bound,))
+        month_start = cursor.fetchone()[0].replace(day=1)
+    else:
+        month_start = add_months(date.today().replace(day=1), -RETENTION_MONTHS)
+
+    new_partitions = []
+    while month_start < target:
+        upper = unix_timestamp(cursor, add_months(month_start, 1))
+        if upper > last_bound:
+            new_partitions.append((partition_name(month_start), upper))
+        month_start = add_months(month_start, 1)
+
+    if not new_partitions:
+        logger.info("추가할 파티션 없음")
+        cursor.close()
+        return []
+
+    definitions = ', '.join(f"PARTITION {name} VALUES LESS THAN ({upper})" for name, upper in new_partitions)
+    sql = (f"ALTER TABLE {TABLE} REORGANIZE PARTITION {MAX_PARTITION} INTO "
+           f"({definitions}, PARTITION {MAX_PARTITION} VALUES LESS THAN MAXVALUE)")
+    logger.info(f"파티션 생성: {[name for name, _ in new_partitions]}")
+    if not dry_run:
+        cursor.execute(sql)
+    cursor.close()
+    return [name for name, _ in new_partitions]
+
+
+def archive_partition(connection, name, archive_dir=ARCHIVE_DIR):
+    """파티션 데이터를 gzip NDJSON으로 스트리밍 보관하고 보관된 행 수를 반환"""
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{TABLE}_{name}.ndjson.gz")
+    tmp_path = f"{path}.tmp"
+
+    count = 0
+    cursor = connection.cursor()
+    try:
+        # 파티션 이름은 information_schema에서 읽은 값이므로 식별자로 직접 사용
+        cursor.execute(f"SELECT id, user_id, message, created_at FROM {TABLE} PARTITION ({name}) ORDER BY id")
+        with gzip.open(tmp_path, 'wb') as f:
+            while True:
+                rows = cursor.fetchmany(ARCHIVE_BATCH_SIZE)
+                if not rows:
+                    break
+                for row_id, user_id, message, created_at in rows:
+                    f.write(serialization.dumps_bytes({
+                        'id': row_id,
+                        'user_id': user_id,
+                        'message': message,
+                        'created_at': created_at
+                    }))
+                    f.write(b'\n')
+                count += len(rows)
+    finally:
+        cursor.close()
+
+    os.replace(tmp_path, path)
+    logger.info(f"파티션 보관 완료: {name} -> {path} ({count}행)")
+    return count
+
+
+def archive_old_partitions(connection, retention_months=RETENTION_MONTHS, archive_dir=ARCHIVE_DIR, dry_run=False):
+    """상한이 보관 기준일 이전인 파티션을 보관 후 DROP"""
+    cursor = connection.cursor()
+    cutoff = unix_timestamp(cursor, add_months(date.today().replace(day=1), -retention_months))
+    expired = [name for name, bound in list_partitions(cursor) if bound is not None and bound <= cutoff]
+
+    archived = []
+    for name in expired:
+        if dry_run:
+            logger.info(f"[dry-run] 보관 대상 파티션: {name}")
+            continue
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE} PARTITION ({name})")
+        expected = cursor.fetchone()[0]
+        count = archive_partition(connection, name, archive_dir)
+        if count != expected:
+            # 보관 중 데이터가 변경되었으면 DROP하지 않고 다음 실행에서 재시도
+            logger.error(f"파티션 행 수 불일치로 DROP 생략: {name} (expected={expected}, archived={count})")
+            continue
+        cursor.execute(f"ALTER TABLE {TABLE} DROP PARTITION {name}")
+        logger.info(f"파티션 삭제: {name}")
+        archived.append(name)
+    cursor.close()
+    return archived
+
+
+def main():
+    dry_run = '--dry-run' in sys.argv
+    connection = get_connection()
+    try:
+        ensure_future_partitions(connection, dry_run=dry_run)
+        archive_old_partitions(connection, dry_run=dry_run)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
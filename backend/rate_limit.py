@@ -0,0 +1,132 @@
+# Redis 기반 토큰 버킷 Rate Limiter
+# 버킷 갱신은 Lua 스크립트로 원자적으로 처리하므로 여러 Pod가 같은 버킷을 공유할 수 있다.
+# Redis에서 거부된 키는 retry_after 동안 로컬에 기록하여 재요청 시 Redis 호출 없이 거부한다.
+import math
+import os
+import threading
+import time
+
+from prometheus_client import Counter
+
+RATE_LIMITED_REQUESTS = Counter('rate_limited_requests_total', 'Requests rejected by rate limiter', ['route_class', 'source'])
+
+# KEYS[1]=버킷 키, ARGV=[초당 토큰, 버킷 크기, 요청 비용]
+# 반환값: {허용 여부(1/0), 재시도까지 남은 시간(ms)}
+# 현재 시각은 Pod 시계가 아닌 Redis TIME을 사용 (Pod 간 시계 차이로 버킷이 일찍 차거나 비지 않도록)
+TOKEN_BUCKET_LUA = """
+-- TIME 이후 쓰기가 있으므로 Redis 5 미만에서는 명령 단위 복제 필요 (이후 버전은 기본값)
+if redis.replicate_commands then
+    redis.replicate_commands()
+end
+
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+    tokens = capacity
+    ts = now
+end
+
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate / 1000)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) * 1000 / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity * 1000 / rate) + 1000)
+return {allowed, retry_after}
+"""
+
+# 라우트 클래스별 기본값: (초당 토큰, 버킷 크기)
+# RATE_LIMIT_<CLASS>="초당토큰/버킷크기" 환경변수로 변경 가능 (예: RATE_LIMIT_AUTH="0.5/10")
+DEFAULT_RATES = {
+    'auth': (0.5, 10),
+    'write': (5, 20),
+    'search': (5, 20),
+    'read': (20, 50),
+}
+
+
+def load_rates():
+    rates = {}
+    for route_class, default in DEFAULT_RATES.items():
+        value = os.getenv(f"RATE_LIMIT_{route_class.upper()}")
+        if value:
+            rate, capacity = value.split('/')
+            rates[route_class] = (float(rate), float(capacity))
+        else:
+            rates[route_class] = default
+    return rates
+
+
+def classify_route(method, path):
+    """요청을 라우트 클래스(auth/search/write/read)로 분류"""
+    if path in ('/login', '/register'):
+        return 'auth'
+    if path.startswith('/messages/search'):
+        return 'search'
+    if method in ('POST', 'PUT', 'PATCH', 'DELETE'):
+        return 'write'
+    return 'read'
+
+
+class RateLimiter:
+    def __init__(self, redis_client, rates=None, key_prefix='ratelimit', max_local_entries=10000):
+        self.rates = rates or load_rates()
+        self.key_prefix = key_prefix
+        self.max_local_entries = max_local_entries
+        self._script = redis_client.register_script(TOKEN_BUCKET_LUA)
+        self._lock = threading.Lock()
+        # 버킷 키 -> 로컬에서 거부할 시각 (monotonic)
+        self._blocked_until = {}
+
+    def _local_retry_after(self, key):
+        with self._lock:
+            blocked_until = self._blocked_until.get(key)
+            if blocked_until is None:
+                return 0.0
+            remaining = blocked_until - time.monotonic()
+            if remaining <= 0:
+                del self._blocked_until[key]
+                return 0.0
+            return remaining
+
+    def _block_locally(self, key, seconds):
+        with self._lock:
+            if len(self._blocked_until) >= self.max_local_entries:
+                now = time.monotonic()
+                self._blocked_until = {k: v for k, v in self._blocked_until.items() if v > now}
+                if len(self._blocked_until) >= self.max_local_entries:
+                    self._blocked_until.clear()
+            self._blocked_until[key] = time.monotonic() + seconds
+
+    def check(self, identity, route_class, cost=1):
+        """허용되면 0, 거부되면 Retry-After 초(정수, 1 이상)를 반환"""
+        rate, capacity = self.rates[route_class]
+        key = f"{self.key_prefix}:{route_class}:{identity}"
+
+        # 로컬 사전 검사: 최근에 거부된 키는 Redis 호출 없이 거부
+        remaining = self._local_retry_after(key)
+        if remaining > 0:
+            RATE_LIMITED_REQUESTS.labels(route_class=route_class, source='local').inc()
+            return max(1, math.ceil(remaining))
+
+        allowed, retry_after_ms = self._script(keys=[key], args=[rate, capacity, cost])
+        if allowed:
+            return 0
+
+        retry_after = int(retry_after_ms) / 1000
+        self._block_locally(key, retry_after)
+        RATE_LIMITED_REQUESTS.labels(route_class=route_class, source='redis').inc()
+        return max(1, math.ceil(retry_after))
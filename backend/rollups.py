@@ -0,0 +1,153 @@
+# api-logs 토픽 스트리밍 집계 (분/시간 단위 rollup)
+# Kafka Consumer가 api-logs를 읽어 Redis에 버킷별 집계를 유지한다.
+#   rollup:{res}:{bucket}:total      HASH  count, errors
+#   rollup:{res}:{bucket}:endpoint   HASH  "{method} {endpoint}" -> 호출 수
+#   rollup:{res}:{bucket}:errors     HASH  "{method} {endpoint}" -> 에러 수
+#   rollup:{res}:{bucket}:user       HASH  user_id -> 호출 수 (조회는 사용자 단위 HGET만)
+#   rollup:{res}:{bucket}:users      HyperLogLog (고유 사용자 수)
+# 분 단위 키는 짧게, 시간 단위 키는 길게 TTL을 주어 오래된 데이터는 시간 단위로만 남긴다.
+# 사용법: python rollups.py
+import logging
+import os
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import redis
+from kafka import KafkaConsumer
+
+import serialization
+
+logger = logging.getLogger('rollups')
+
+RESOLUTIONS = {
+    'minute': ('%Y%m%d%H%M', int(os.getenv('ROLLUP_MINUTE_TTL', str(2 * 86400)))),
+    'hour': ('%Y%m%d%H', int(os.getenv('ROLLUP_HOUR_TTL', str(30 * 86400)))),
+}
+
+
+def bucket_of(timestamp, resolution):
+    return timestamp.strftime(RESOLUTIONS[resolution][0])
+
+
+def rollup_key(resolution, bucket, field):
+    return f"rollup:{resolution}:{bucket}:{field}"
+
+
+def aggregate(records):
+    """레코드 배치를 (키 -> 필드 -> 증가량), (HLL 키 -> 사용자 집합)으로 메모리에서 먼저 합산"""
+    increments = defaultdict(Counter)
+    unique_users = defaultdict(set)
+    for record in records:
+        if record is None:
+            continue
+        try:
+            timestamp = datetime.fromisoformat(record['timestamp'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        route = f"{record.get('method', '')} {record.get('endpoint', '')}"
+        user = str(record.get('user_id') or 'unknown')
+        is_error = record.get('status') == 'error'
+        for resolution in RESOLUTIONS:
+            bucket = bucket_of(timestamp, resolution)
+            increments[rollup_key(resolution, bucket, 'total')]['count'] += 1
+            increments[rollup_key(resolution, bucket, 'endpoint')][route] += 1
+            increments[rollup_key(resolution, bucket, 'user')][user] += 1
+            if is_error:
+                increments[rollup_key(resolution, bucket, 'total')]['errors'] += 1
+                increments[rollup_key(resolution, bucket, 'errors')][route] += 1
+            unique_users[rollup_key(resolution, bucket, 'users')].add(user)
+    return increments, unique_users
+
+
+def ttl_of(key):
+    return RESOLUTIONS[key.split(':')[1]][1]
+
+
+def apply_rollups(redis_client, records):
+    """배치 집계 결과를 한 번의 pipeline으로 Redis에 반영"""
+    increments, unique_users = aggregate(records)
+    pipe = redis_client.pipeline(transaction=False)
+    for key, fields in increments.items():
+        for field, amount in fields.items():
+            pipe.hincrby(key, field, amount)
+        pipe.expire(key, ttl_of(key))
+    for key, users in unique_users.items():
+        pipe.pfadd(key, *users)
+        pipe.expire(key, ttl_of(key))
+    pipe.execute()
+
+
+def read_rollup(redis_client, resolution, bucket, user=None):
+    """버킷 하나의 집계 조회 (버킷당 Redis 명령 4~5개, 원본 레코드 수와 무관)
+    사용자별 호출 수 해시는 활성 사용자 수만큼 커지므로 전체를 읽지 않고 user를 준 경우 그 사용자만 HGET"""
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hgetall(rollup_key(resolution, bucket, 'total'))
+    pipe.hgetall(rollup_key(resolution, bucket, 'endpoint'))
+    pipe.hgetall(rollup_key(resolution, bucket, 'errors'))
+    pipe.pfcount(rollup_key(resolution, bucket, 'users'))
+    if user is not None:
+        pipe.hget(rollup_key(resolution, bucket, 'user'), user)
+    total, endpoints, errors, unique_users, *user_count = pipe.execute()
+
+    count = int(total.get('count', 0))
+    error_count = int(total.get('errors', 0))
+    rollup = {
+        'bucket': bucket,
+        'count': count,
+        'errors': error_count,
+        'error_rate': round(error_count / count, 4) if count else 0.0,
+        'unique_users': unique_users,
+        'endpoints': {
+            route: {'count': int(value), 'errors': int(errors.get(route, 0))}
+            for route, value in endpoints.items()
+        },
+    }
+    if user is not None:
+        rollup['users'] = {user: int(user_count[0] or 0)}
+    return rollup
+
+
+def main():
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    consumer = KafkaConsumer(
+        'api-logs',
+        bootstrap_servers=os.getenv('KAFKA_SERVERS', 'my-kafka:9092'),
+        value_deserializer=serialization.safe_api_log_deserializer,
+        security_protocol='SASL_PLAINTEXT',
+        sasl_mechanism='PLAIN',
+        sasl_plain_username=os.getenv('KAFKA_USERNAME', 'user1'),
+        sasl_plain_password=os.getenv('KAFKA_PASSWORD', ''),
+        group_id=os.getenv('ROLLUP_GROUP_ID', 'api-logs-rollup'),
+        auto_offset_reset='earliest',
+        enable_auto_commit=False
+    )
+    redis_client = redis.Redis(
+        host=os.getenv('REDIS_HOST', 'redis-master.sungho.svc.cluster.local'),
+        port=6379,
+        username='default',
+        password=os.getenv('REDIS_PASSWORD'),
+        decode_responses=True,
+        db=0
+    )
+    logger.info("api-logs rollup worker 시작")
+    try:
+        while True:
+            batches = consumer.poll(timeout_ms=1000, max_records=int(os.getenv('ROLLUP_BATCH_SIZE', '500')))
+            records = [message.value for messages in batches.values() for message in messages]
+            if not records:
+                continue
+            # Redis 반영 후 offset commit (at-least-once)
+            apply_rollups(redis_client, records)
+            consumer.commit()
+            logger.debug(f"rollup 반영: {len(records)}건")
+    finally:
+        consumer.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+# JSON 직렬화 계층
+# HTTP 응답(Flask JSON provider), Redis 로그, Kafka serializer가 모두 이 모듈을 사용한다.
+# orjson이 설치되어 있으면 orjson을, 없으면 표준 json 모듈을 사용한다.
+import json
+import logging
+import os
+import struct
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def default_encoder(obj):
+    """기본 인코더: datetime/date는 ISO 문자열로 변환"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class StdlibJSONCodec:
+    """표준 json 모듈 기반 코덱 (fallback)"""
+    name = 'json'
+
+    def dumps(self, obj, default=None, sort_keys=False):
+        return json.dumps(obj, default=default or default_encoder, sort_keys=sort_keys,
+                          ensure_ascii=False, separators=(',', ':'))
+
+    def dumps_bytes(self, obj, default=None, sort_keys=False):
+        return self.dumps(obj, default=default, sort_keys=sort_keys).encode('utf-8')
+
+    def loads(self, data):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = bytes(data).decode('utf-8')
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """orjson 기반 코덱 (bytes를 직접 생성하므로 encode 단계가 없음)"""
+    name = 'orjson'
+
+    def __init__(self):
+        # datetime은 default로 넘겨서 backend와 관계없이 같은 형식으로 직렬화한다
+        self._option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, default=None, sort_keys=False):
+        return self.dumps_bytes(obj, default=default, sort_keys=sort_keys).decode('utf-8')
+
+    def dumps_bytes(self, obj, default=None, sort_keys=False):
+        option = self._option | orjson.OPT_SORT_KEYS if sort_keys else self._option
+        return orjson.dumps(obj, default=default or default_encoder, option=option)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+def available_codecs():
+    """현재 환경에서 사용 가능한 코덱 목록 (빠른 순)"""
+    codecs = []
+    if orjson is not None:
+        codecs.append(OrjsonCodec())
+    codecs.append(StdlibJSONCodec())
+    return codecs
+
+
+def select_codec(name=None):
+    """JSON_BACKEND 환경변수(orjson/json)로 backend를 강제할 수 있음"""
+    name = (name or os.getenv('JSON_BACKEND', '')).lower()
+    codecs = available_codecs()
+    for candidate in codecs:
+        if candidate.name == name:
+            return candidate
+    return codecs[0]
+
+
+codec = select_codec()
+
+
+def dumps(obj, default=None, sort_keys=False):
+    return codec.dumps(obj, default=default, sort_keys=sort_keys)
+
+
+def dumps_bytes(obj, default=None, sort_keys=False):
+    return codec.dumps_bytes(obj, default=default, sort_keys=sort_keys)
+
+
+def loads(data):
+    return codec.loads(data)
+
+
+# api-logs 토픽 레코드 인코딩
+# KAFKA_LOG_FORMAT=binary 이면 스키마 버전이 있는 고정 바이너리 형식으로 전송한다.
+# 소비자는 첫 바이트로 형식을 판별하므로 JSON/바이너리 레코드가 섞여 있어도 디코딩된다.
+#
+# 바이너리 스키마 v1 (big-endian):
+#   magic(1B=0xA1) | version(1B) | timestamp(int64, epoch ms) | pid(uint32)
+#   | endpoint | method | status | user_id   (각각 uint16 길이 + UTF-8)
+# message/source/thread_id는 전송하지 않으며, message는 디코딩 시 재구성한다.
+KAFKA_LOG_FORMAT = os.getenv('KAFKA_LOG_FORMAT', 'json').lower()
+
+API_LOG_MAGIC = 0xA1
+API_LOG_SCHEMA_VERSION = 1
+API_LOG_SOURCE = 'aks-demo-backend'
+_API_LOG_HEADER = struct.Struct('>BBqI')
+_STR_LEN = struct.Struct('>H')
+_API_LOG_STR_FIELDS = ('endpoint', 'method', 'status', 'user_id')
+
+
+def api_log_message(user_id, method, endpoint, status):
+    return f"{user_id}가 {method} {endpoint} 호출 ({status})"
+
+
+def encode_api_log_binary(record):
+    timestamp = record.get('timestamp')
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    timestamp_ms = int((timestamp or datetime.now()).timestamp() * 1000)
+
+    parts = [_API_LOG_HEADER.pack(API_LOG_MAGIC, API_LOG_SCHEMA_VERSION, timestamp_ms,
+                                  record.get('pid', 0) & 0xFFFFFFFF)]
+    for field in _API_LOG_STR_FIELDS:
+        value = record.get(field)
+        encoded = b'' if value is None else str(value).encode('utf-8')
+        parts.append(_STR_LEN.pack(len(encoded)))
+        parts.append(encoded)
+    return b''.join(parts)
+
+
+def decode_api_log_binary(data):
+    magic, version, timestamp_ms, pid = _API_LOG_HEADER.unpack_from(data, 0)
+    if magic != API_LOG_MAGIC or version != API_LOG_SCHEMA_VERSION:
+        raise ValueError(f"지원하지 않는 api-logs 스키마: magic={magic:#x}, version={version}")
+
+    record = {
+        'timestamp': datetime.fromtimestamp(timestamp_ms / 1000).isoformat(),
+        'pid': pid,
+        'source': API_LOG_SOURCE,
+    }
+    offset = _API_LOG_HEADER.size
+    for field in _API_LOG_STR_FIELDS:
+        (length,) = _STR_LEN.unpack_from(data, offset)
+        offset += _STR_LEN.size
+        record[field] = bytes(data[offset:offset + length]).decode('utf-8')
+        offset += length
+    record['message'] = api_log_message(record['user_id'], record['method'],
+                                        record['endpoint'], record['status'])
+    return record
+
+
+def api_log_serializer(record):
+    """api-logs Producer용 value_serializer (KAFKA_LOG_FORMAT에 따라 선택)"""
+    if KAFKA_LOG_FORMAT == 'binary':
+        return encode_api_log_binary(record)
+    return codec.dumps_bytes(record)
+
+
+def api_log_deserializer(data):
+    """api-logs Consumer용 value_deserializer (JSON/바이너리 혼재 토픽 지원)"""
+    if data and data[0] == API_LOG_MAGIC:
+        return decode_api_log_binary(data)
+    return codec.loads(data)
+
+
+def safe_api_log_deserializer(data):
+    """api_log_deserializer와 같지만 디코딩할 수 없는 레코드는 None으로 반환
+    (손상된 레코드 하나 때문에 consumer가 멈추지 않도록 호출자가 None을 건너뜀)"""
+    try:
+        return api_log_deserializer(data)
+    except Exception as e:
+        logger.warning(f"api-logs 레코드 디코딩 실패: {str(e)}")
+        return None
@@ -0,0 +1,94 @@
+# Single-flight 요청 병합
+# 같은 프로세스에서 동일한 키(정규화된 쿼리 + 파라미터)로 동시에 들어온 읽기 요청은
+# 하나의 실행 결과를 공유한다. cache_ttl > 0 이면 완료된 결과를 짧은 시간 동안 재사용한다.
+import threading
+import time
+
+from prometheus_client import Counter
+
+COALESCED_REQUESTS = Counter('singleflight_coalesced_requests_total',
+                             'Requests served by an in-flight or micro-cached result', ['group', 'source'])
+EXECUTED_REQUESTS = Counter('singleflight_executed_requests_total',
+                            'Requests that actually executed the underlying call', ['group'])
+
+
+class LeaderAbortedError(Exception):
+    """선행 호출이 결과 없이 중단됨 (GreenletExit, gevent Timeout 등 Exception이 아닌 예외)"""
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, name, cache_ttl=0.0, max_cache_entries=1000):
+        self.name = name
+        self.cache_ttl = cache_ttl
+        self.max_cache_entries = max_cache_entries
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._cache = {}
+        # invalidate() 이전에 시작된 호출의 결과가 캐시에 저장되지 않도록 세대 번호로 구분
+        self._generation = 0
+
+    def do(self, key, func):
+        """key가 같은 동시 호출은 func를 한 번만 실행하고 결과를 공유"""
+        with self._lock:
+            if self.cache_ttl > 0:
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] > time.monotonic():
+                    COALESCED_REQUESTS.labels(group=self.name, source='cache').inc()
+                    return cached[1]
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                generation = self._generation
+
+        if not leader:
+            call.event.wait()
+            COALESCED_REQUESTS.labels(group=self.name, source='inflight').inc()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        EXECUTED_REQUESTS.labels(group=self.name).inc()
+        completed = False
+        try:
+            call.result = func()
+            completed = True
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # 결과 없이 끝났다면(BaseException) 대기자가 None을 결과로 받지 않도록 오류를 남김
+            if not completed and call.error is None:
+                call.error = LeaderAbortedError(f"{self.name} single-flight 선행 호출이 결과 없이 중단되었습니다")
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                if completed and self.cache_ttl > 0 and generation == self._generation:
+                    self._store(key, call.result)
+            call.event.set()
+        return call.result
+
+    def _store(self, key, result):
+        # lock을 잡은 상태에서 호출
+        if len(self._cache) >= self.max_cache_entries:
+            now = time.monotonic()
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            if len(self._cache) >= self.max_cache_entries:
+                self._cache.clear()
+        self._cache[key] = (time.monotonic() + self.cache_ttl, result)
+
+    def invalidate(self):
+        """쓰기 후 micro-cache 비우기 (이후 요청은 진행 중인 이전 호출에 합류하지 않음)"""
+        with self._lock:
+            self._cache.clear()
+            self._calls.clear()
+            self._generation += 1
@@ -0,0 +1,156 @@
+# 트레이스 샘플링 설정
+# - ParentBased + 라우트별 비율 샘플링 (OTEL_TRACES_SAMPLE_RATIO, OTEL_SAMPLE_ROUTE_OVERRIDES)
+# - 샘플링되지 않은 서버 요청도 root span만 기록(RECORD_ONLY)해 두고,
+#   에러이거나 느린 요청이면 KeepErrorsAndSlowSpanProcessor가 별도로 내보낸다.
+#   (자식 span은 샘플링된 요청에서만 생성되므로 비용은 root span 1개로 제한됨)
+import collections
+import contextlib
+import logging
+import os
+import threading
+from urllib.parse import urlsplit
+
+from opentelemetry.instrumentation.utils import suppress_instrumentation
+from opentelemetry.sdk.trace import SpanProcessor
+from opentelemetry.sdk.trace.sampling import (
+    ALWAYS_OFF, ALWAYS_ON, Decision, ParentBased, Sampler, SamplingResult, TraceIdRatioBased
+)
+from opentelemetry.trace import SpanKind, StatusCode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_RATIO = 0.1
+# 기본 라우트별 비율 (OTEL_SAMPLE_ROUTE_OVERRIDES로 추가/변경)
+DEFAULT_ROUTE_OVERRIDES = {'/metrics': 0.0}
+DEFAULT_SLOW_SPAN_MS = 2000
+TRACE_LOW_VALUE_REDIS = os.getenv('OTEL_TRACE_LOW_VALUE_REDIS', 'false').lower() == 'true'
+
+
+def parse_route_overrides(value):
+    """"/metrics=0,/logs/*=0.01" 형식 -> {route: ratio}, '*'로 끝나면 prefix 매칭"""
+    overrides = dict(DEFAULT_ROUTE_OVERRIDES)
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, ratio = item.split('=', 1)
+            overrides[route.strip()] = float(ratio)
+    return overrides
+
+
+def _ratio_sampler(ratio):
+    if ratio >= 1:
+        return ALWAYS_ON
+    if ratio <= 0:
+        return ALWAYS_OFF
+    return TraceIdRatioBased(ratio)
+
+
+class RouteRatioSampler(Sampler):
+    """root span용 라우트별 비율 샘플러 (ParentBased의 root로 사용)"""
+
+    def __init__(self, ratio, overrides=None, record_unsampled_server_spans=True):
+        self._default = (ratio, _ratio_sampler(ratio))
+        self._exact = {}
+        self._prefixes = []
+        for route, route_ratio in (overrides or {}).items():
+            entry = (route_ratio, _ratio_sampler(route_ratio))
+            if route.endswith('*'):
+                self._prefixes.append((route[:-1], entry))
+            else:
+                self._exact[route] = entry
+        # 긴 prefix 우선
+        self._prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        self._record_unsampled = record_unsampled_server_spans
+
+    @staticmethod
+    def _route(name, attributes):
+        attributes = attributes or {}
+        for key in ('url.path', 'http.target', 'http.route'):
+            value = attributes.get(key)
+            if value:
+                return urlsplit(str(value)).path
+        # Flask span 이름은 "GET /path" 또는 "/path" 형식
+        return name.split(' ')[-1] if name else ''
+
+    def _lookup(self, route):
+        entry = self._exact.get(route)
+        if entry is not None:
+            return entry
+        for prefix, prefix_entry in self._prefixes:
+            if route.startswith(prefix):
+                return prefix_entry
+        return self._default
+
+    def should_sample(self, parent_context, trace_id, name, kind=None, attributes=None, links=None, trace_state=None):
+        ratio, sampler = self._lookup(self._route(name, attributes))
+        result = sampler.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if (result.decision == Decision.DROP and self._record_unsampled
+                and kind == SpanKind.SERVER and ratio > 0):
+            # 에러/지연 판별을 위해 root span만 기록 (내보내기는 KeepErrorsAndSlowSpanProcessor가 결정)
+            return SamplingResult(Decision.RECORD_ONLY, attributes, result.trace_state)
+        return result
+
+    def get_description(self):
+        return f"RouteRatioSampler{{ratio={self._default[0]}, routes={len(self._exact) + len(self._prefixes)}}}"
+
+
+def build_sampler():
+    ratio = float(os.getenv('OTEL_TRACES_SAMPLE_RATIO', str(DEFAULT_SAMPLE_RATIO)))
+    overrides = parse_route_overrides(os.getenv('OTEL_SAMPLE_ROUTE_OVERRIDES'))
+    return ParentBased(root=RouteRatioSampler(ratio, overrides))
+
+
+class KeepErrorsAndSlowSpanProcessor(SpanProcessor):
+    """샘플링되지 않았지만 에러이거나 느린 span을 모아서 주기적으로 내보냄"""
+
+    def __init__(self, exporter, slow_threshold_ms=None, export_interval=5.0, max_queue_size=2048):
+        self._exporter = exporter
+        self._slow_threshold_ns = int((slow_threshold_ms or int(os.getenv('OTEL_SLOW_SPAN_MS', str(DEFAULT_SLOW_SPAN_MS)))) * 1e6)
+        self._export_interval = export_interval
+        self._queue = collections.deque(maxlen=max_queue_size)
+        self._lock = threading.Lock()
+        self._shutdown = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='otel-keep-errors-slow', daemon=True)
+        self._worker.start()
+
+    def on_start(self, span, parent_context=None):
+        pass
+
+    def on_end(self, span):
+        # 샘플링된 span은 BatchSpanProcessor가 이미 내보냄
+        if span.context.trace_flags.sampled:
+            return
+        is_error = span.status.status_code == StatusCode.ERROR
+        is_slow = span.end_time - span.start_time >= self._slow_threshold_ns
+        if is_error or is_slow:
+            with self._lock:
+                self._queue.append(span)
+
+    def _drain(self):
+        with self._lock:
+            spans = list(self._queue)
+            self._queue.clear()
+        if spans:
+            try:
+                self._exporter.export(spans)
+            except Exception as e:
+                logger.debug(f"에러/지연 span 내보내기 실패: {str(e)}")
+
+    def _run(self):
+        while not self._shutdown.wait(self._export_interval):
+            self._drain()
+
+    def force_flush(self, timeout_millis=30000):
+        self._drain()
+        return True
+
+    def shutdown(self):
+        self._shutdown.set()
+        self._drain()
+
+
+def low_value_scope():
+    """활성 요청 카운트, 감사 로그 등 가치가 낮은 Redis 호출의 span 생성을 생략하는 컨텍스트
+    (OTEL_TRACE_LOW_VALUE_REDIS=true 이면 평소대로 span 생성)"""
+    if TRACE_LOW_VALUE_REDIS:
+        return contextlib.nullcontext()
+    return suppress_instrumentation()
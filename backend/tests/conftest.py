@@ -0,0 +1,5 @@
+# backend 모듈은 backend/ 디렉터리 기준 최상위 import(import serialization 등)를 사용
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
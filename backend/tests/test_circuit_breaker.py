@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def fail():
+    raise ConnectionError("down")
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+
+
+def test_opens_after_consecutive_failures_and_rejects_calls():
+    breaker = CircuitBreaker('test_open', failure_threshold=3, recovery_timeout=60)
+    open_breaker(breaker)
+
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.is_open()
+    with pytest.raises(CircuitOpenError) as excinfo:
+        breaker.call(lambda: 'not called')
+    assert excinfo.value.name == 'test_open'
+    assert 0 < excinfo.value.retry_after <= 60
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker('test_reset', failure_threshold=2, recovery_timeout=60)
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.call(lambda: 'ok') == 'ok'
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_probe_success_closes():
+    breaker = CircuitBreaker('test_half_open_close', failure_threshold=1, recovery_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert not breaker.is_open()
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = CircuitBreaker('test_half_open_reopen', failure_threshold=1, recovery_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_limited_probes():
+    breaker = CircuitBreaker('test_half_open_limit', failure_threshold=1, recovery_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    # 첫 probe가 진행 중인 동안 다른 호출은 거부
+    assert breaker.allow_request()
+    assert breaker.is_open()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class Cancelled(BaseException):
+    """GreenletExit/gevent Timeout처럼 Exception이 아닌 취소 예외"""
+
+
+def test_cancelled_half_open_probe_releases_slot():
+    breaker = CircuitBreaker('test_half_open_cancel', failure_threshold=1, recovery_timeout=0.05)
+    open_breaker(breaker)
+    time.sleep(0.06)
+
+    def cancelled():
+        raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        breaker.call(cancelled)
+    # 슬롯이 반납되어 다음 probe가 허용되고, 성공하면 닫힘
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.is_open()
+    assert breaker.call(lambda: 'ok') == 'ok'
+    assert breaker.state == CircuitBreaker.CLOSED
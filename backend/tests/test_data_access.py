@@ -0,0 +1,106 @@
+from datetime import datetime
+
+import pytest
+from mysql.connector import errors
+
+from circuit_breaker import CircuitBreaker
+from data_access import IN_LIST_CHUNK_SIZE, DataAccess, _in_chunks
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self._rows = rows
+
+    def fetchall(self):
+        return self._rows
+
+
+class FakeConnection:
+    """execute된 (sql, params)를 기록하고 handler 결과를 행으로 반환"""
+    reused = False
+
+    def __init__(self, executed, handler):
+        self._executed = executed
+        self._handler = handler
+
+    def execute(self, sql, params=()):
+        params = tuple(params)
+        self._executed.append((sql, params))
+        return FakeCursor(self._handler(sql, params))
+
+    def close(self):
+        pass
+
+    def discard(self):
+        pass
+
+
+def make_access(handler=lambda sql, params: []):
+    executed = []
+    return DataAccess(lambda readonly=False: FakeConnection(executed, handler)), executed
+
+
+def test_in_chunks_pads_to_power_of_two():
+    assert list(_in_chunks([1, 2, 3])) == [('%s, %s, %s, %s', [1, 2, 3, 3])]
+    assert list(_in_chunks([7])) == [('%s', [7])]
+    assert list(_in_chunks([])) == []
+
+
+def test_in_chunks_splits_large_lists():
+    chunks = list(_in_chunks(range(IN_LIST_CHUNK_SIZE * 2 + 5)))
+    assert [len(params) for _, params in chunks] == [IN_LIST_CHUNK_SIZE, IN_LIST_CHUNK_SIZE, 8]
+    assert all(placeholders.count('%s') == len(params) for placeholders, params in chunks)
+
+
+def test_empty_id_lists_do_not_query():
+    access, executed = make_access()
+    assert access.users_by_ids([]) == []
+    assert access.users_by_usernames([]) == []
+    assert access.list_messages(user_ids=[]) == []
+    assert executed == []
+
+
+def test_users_by_ids_queries_each_chunk():
+    access, executed = make_access(lambda sql, params: [(user_id, f"user{user_id}") for user_id in set(params)])
+    user_ids = list(range(IN_LIST_CHUNK_SIZE + 1))
+    rows = access.users_by_ids(user_ids)
+    assert len(executed) == 2
+    assert sorted(row[0] for row in rows) == user_ids
+
+
+def test_list_messages_merges_chunks_newest_first():
+    def handler(sql, params):
+        user_ids = set(params)
+        return sorted(((user_id, 'm', datetime(2026, 1, 1, 0, user_id % 60), user_id) for user_id in user_ids),
+                      key=lambda row: row[2], reverse=True)
+
+    access, executed = make_access(handler)
+    rows = access.list_messages(user_ids=list(range(IN_LIST_CHUNK_SIZE + 10)))
+    assert len(executed) == 2
+    assert [row.created_at for row in rows] == sorted((row.created_at for row in rows), reverse=True)
+
+
+def test_query_failures_are_recorded_in_breaker():
+    breaker = CircuitBreaker('test_data_access', failure_threshold=2, recovery_timeout=60)
+
+    def timeout(sql, params):
+        raise errors.OperationalError("Lost connection to server during query")
+
+    executed = []
+    access = DataAccess(lambda readonly=False: FakeConnection(executed, timeout), breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(errors.OperationalError):
+            access.users_by_ids([1])
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_request_errors_do_not_open_breaker():
+    breaker = CircuitBreaker('test_data_access_integrity', failure_threshold=1, recovery_timeout=60)
+
+    def duplicate(sql, params):
+        raise errors.IntegrityError("Duplicate entry")
+
+    access = DataAccess(lambda readonly=False: FakeConnection([], duplicate), breaker=breaker)
+    with pytest.raises(errors.IntegrityError):
+        access.create_user('bob', 'hash')
+    assert breaker.state == CircuitBreaker.CLOSED
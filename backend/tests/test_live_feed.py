@@ -0,0 +1,30 @@
+import fakeredis
+import pytest
+
+from live_feed import MessageFeed
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def test_event_published_right_after_subscribe_is_delivered(server):
+    feed = MessageFeed(lambda: fakeredis.FakeRedis(server=server))
+    subscription = feed.subscribe(timeout=5)
+    try:
+        # subscribe()가 반환되면 Redis 구독이 확인된 상태이므로 바로 발행한 이벤트도 수신
+        feed.publish(fakeredis.FakeRedis(server=server), {'id': 1, 'message': 'hi'})
+        assert subscription.get(timeout=5) == {'id': 1, 'message': 'hi'}
+    finally:
+        feed.unsubscribe(subscription)
+
+
+def test_subscribe_times_out_when_redis_is_unavailable():
+    def unavailable():
+        raise ConnectionError("redis down")
+
+    feed = MessageFeed(unavailable)
+    with pytest.raises(TimeoutError):
+        feed.subscribe(timeout=0.2)
+    assert not feed._subscriptions
@@ -0,0 +1,123 @@
+import time
+import types
+
+import fakeredis
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, classify_route
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+
+def test_token_bucket_rejects_after_capacity(redis_client):
+    limiter = RateLimiter(redis_client, rates={'auth': (0.5, 3)})
+
+    assert [limiter.check('10.0.0.1', 'auth') for _ in range(3)] == [0, 0, 0]
+    # 토큰 1개가 다시 차는 데 2초 (0.5 토큰/초)
+    assert limiter.check('10.0.0.1', 'auth') == 2
+
+    state = redis_client.hgetall('ratelimit:auth:10.0.0.1')
+    assert float(state['tokens']) < 1
+    assert redis_client.pttl('ratelimit:auth:10.0.0.1') > 0
+
+
+def test_buckets_are_per_identity_and_route_class(redis_client):
+    limiter = RateLimiter(redis_client, rates={'auth': (0.5, 1), 'read': (0.5, 1)})
+
+    assert limiter.check('10.0.0.1', 'auth') == 0
+    assert limiter.check('10.0.0.1', 'auth') > 0
+    assert limiter.check('10.0.0.2', 'auth') == 0
+    assert limiter.check('10.0.0.1', 'read') == 0
+
+
+def test_rejected_key_is_blocked_locally_without_redis(redis_client):
+    limiter = RateLimiter(redis_client, rates={'write': (1, 1)})
+    assert limiter.check('user:1', 'write') == 0
+    assert limiter.check('user:1', 'write') == 1
+
+    # 로컬 차단 중에는 Redis 버킷이 비어 있어도 거부
+    redis_client.flushall()
+    assert limiter.check('user:1', 'write') == 1
+
+
+def test_buckets_are_shared_between_limiters(redis_client):
+    # 여러 Pod가 같은 Redis 버킷을 공유
+    first = RateLimiter(redis_client, rates={'auth': (0.5, 2)})
+    second = RateLimiter(redis_client, rates={'auth': (0.5, 2)})
+
+    assert first.check('10.0.0.1', 'auth') == 0
+    assert second.check('10.0.0.1', 'auth') == 0
+    assert first.check('10.0.0.1', 'auth') > 0
+
+
+def test_refill_uses_redis_clock_not_pod_clock(redis_client, monkeypatch):
+    drained = RateLimiter(redis_client, rates={'auth': (0.5, 1)})
+    assert drained.check('10.0.0.1', 'auth') == 0
+    # 시계가 1시간 앞선 Pod에서도 버킷이 미리 차지 않음
+    skewed_clock = types.SimpleNamespace(time=lambda: time.time() + 3600, monotonic=time.monotonic)
+    monkeypatch.setattr(rate_limit, 'time', skewed_clock)
+    skewed = RateLimiter(redis_client, rates={'auth': (0.5, 1)})
+    assert skewed.check('10.0.0.1', 'auth') == 2
+
+
+def test_classify_route():
+    assert classify_route('POST', '/login') == 'auth'
+    assert classify_route('GET', '/messages/search') == 'search'
+    assert classify_route('POST', '/db/message') == 'write'
+    assert classify_route('GET', '/messages') == 'read'
+
+
+@pytest.fixture
+def app_client(redis_client, monkeypatch):
+    """실제 app의 admission_control을 fakeredis 위에서 실행 (DB/Kafka/감사 로그 호출은 대체)"""
+    monkeypatch.setenv('SERVER_MODE', 'threaded')
+    import app as backend_app
+    monkeypatch.setattr(backend_app, 'rate_limiter', RateLimiter(redis_client, rates={'auth': (0.5, 2)}))
+    monkeypatch.setattr(backend_app, 'get_redis_connection', lambda: redis_client)
+    monkeypatch.setattr(backend_app, 'log_to_redis', lambda *args: None)
+    api_stats = []
+    monkeypatch.setattr(backend_app, 'async_log_api_stats', lambda *args: api_stats.append(args))
+    monkeypatch.setattr(backend_app.db_access, 'find_login_user', lambda username: None)
+    client = backend_app.app.test_client()
+    client.api_stats = api_stats
+    return client
+
+
+def login(client, client_ip):
+    # ingress-nginx(10.244.0.10) -> frontend nginx(172.16.0.5) -> backend 경로의 헤더
+    return client.post('/login', json={'username': 'nobody', 'password': 'x'},
+                       headers={'X-Forwarded-For': f'{client_ip}, 10.244.0.10'},
+                       environ_base={'REMOTE_ADDR': '172.16.0.5'})
+
+
+def requests_total(status):
+    from app import REQUEST_COUNT
+    return REQUEST_COUNT.labels(method='POST', endpoint='/login', status=status)._value.get()
+
+
+def test_app_rejects_with_retry_after(app_client):
+    assert [login(app_client, '10.0.0.1').status_code for _ in range(2)] == [401, 401]
+    before = requests_total('429')
+    response = login(app_client, '10.0.0.1')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '2'
+    # 거부된 요청도 http_requests_total과 API 통계에 기록
+    assert requests_total('429') == before + 1
+    assert app_client.api_stats[-1] == ('/login', 'POST', 'rate_limited', 'unknown')
+
+
+def test_app_limits_by_forwarded_client_ip(app_client):
+    # 프록시 주소가 같아도 X-Forwarded-For의 클라이언트별로 버킷이 나뉨
+    assert [login(app_client, f'10.0.0.{i}').status_code for i in range(5)] == [401] * 5
+
+
+def test_app_does_not_trust_short_forwarded_chain(app_client):
+    # 프록시 2개를 거치지 않은 요청(X-Forwarded-For 값 1개)은 위조 가능하므로 연결 주소 기준
+    statuses = [app_client.post('/login', json={'username': 'nobody', 'password': 'x'},
+                                headers={'X-Forwarded-For': f'10.0.0.{i}'},
+                                environ_base={'REMOTE_ADDR': '172.16.0.9'}).status_code for i in range(3)]
+    assert statuses == [401, 401, 429]
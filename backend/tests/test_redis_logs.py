@@ -0,0 +1,51 @@
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv('SERVER_MODE', 'threaded')
+    import app as backend_app
+    redis_client = fakeredis.FakeRedis(decode_responses=True)
+    for i in range(1, 6):
+        redis_client.xadd(backend_app.REDIS_LOG_STREAM, {'action': f'a{i}'}, id=f'1000-{i}')
+    redis_client.xadd(backend_app.REDIS_LOG_STREAM, {'action': 'b'}, id='2000-0')
+    monkeypatch.setattr(backend_app, 'RATE_LIMIT_ENABLED', False)
+    monkeypatch.setattr(backend_app, 'get_redis_connection', lambda: redis_client)
+    monkeypatch.setattr(backend_app, 'get_redis_readonly_connection', lambda: redis_client)
+    monkeypatch.setattr(backend_app, 'async_log_api_stats', lambda *args: None)
+    test_client = backend_app.app.test_client()
+    with test_client.session_transaction() as session:
+        session['user_id'] = 1
+        session['username'] = 'tester'
+    return test_client
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'limit=-1', 'after=abc', 'before=1-2-3',
+                                   'after=1000-1&since=2026-01-01', 'after=1000-1&before=2000',
+                                   'before=2000&until=2026-01-01'])
+def test_invalid_parameters_return_400(client, query):
+    assert client.get(f'/logs/redis?{query}').status_code == 400
+
+
+def test_pages_backwards_with_next_cursor(client):
+    seen, query = [], 'limit=4'
+    while True:
+        response = client.get(f'/logs/redis?{query}')
+        assert response.status_code == 200
+        seen.extend(entry['id'] for entry in response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if cursor is None:
+            break
+        query = f'limit=4&before={cursor}'
+    assert seen == ['2000-0', '1000-5', '1000-4', '1000-3', '1000-2', '1000-1']
+
+
+def test_next_cursor_crosses_millisecond_boundary(client):
+    response = client.get('/logs/redis?limit=1')
+    assert response.headers['X-Next-Cursor'] == f'1999-{2 ** 64 - 1}'
+    assert [entry['id'] for entry in client.get(f"/logs/redis?limit=1&before={response.headers['X-Next-Cursor']}").get_json()] == ['1000-5']
+
+
+def test_after_returns_oldest_first(client):
+    assert [entry['id'] for entry in client.get('/logs/redis?after=1000-4').get_json()] == ['1000-5', '2000-0']
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+import serialization
+
+RECORD = {
+    'timestamp': datetime(2026, 1, 2, 3, 4, 5, 678000).isoformat(),
+    'endpoint': '/db/message',
+    'method': 'POST',
+    'status': 'success',
+    'user_id': '홍길동',
+    'pid': 4321,
+    'source': serialization.API_LOG_SOURCE,
+    'message': serialization.api_log_message('홍길동', 'POST', '/db/message', 'success'),
+}
+
+
+def test_binary_round_trip():
+    data = serialization.encode_api_log_binary(RECORD)
+    assert data[0] == serialization.API_LOG_MAGIC
+    assert serialization.decode_api_log_binary(data) == RECORD
+
+
+def test_json_round_trip():
+    data = serialization.codec.dumps_bytes(RECORD)
+    assert serialization.api_log_deserializer(data) == RECORD
+
+
+@pytest.mark.parametrize('log_format', ['json', 'binary'])
+def test_serializer_follows_log_format(monkeypatch, log_format):
+    monkeypatch.setattr(serialization, 'KAFKA_LOG_FORMAT', log_format)
+    data = serialization.api_log_serializer(RECORD)
+    assert (data[0] == serialization.API_LOG_MAGIC) == (log_format == 'binary')
+    assert serialization.api_log_deserializer(data) == RECORD
+
+
+def test_mixed_topic_decodes_by_first_byte():
+    # 형식 전환 중에는 JSON/바이너리 레코드가 같은 토픽에 섞여 있음
+    other = dict(RECORD, endpoint='/login', status='error', user_id='unknown',
+                 message=serialization.api_log_message('unknown', 'POST', '/login', 'error'))
+    values = [
+        serialization.codec.dumps_bytes(RECORD),
+        serialization.encode_api_log_binary(other),
+        serialization.encode_api_log_binary(RECORD),
+        serialization.codec.dumps_bytes(other),
+    ]
+    assert [serialization.api_log_deserializer(value) for value in values] == [RECORD, other, RECORD, other]
+
+
+def test_unknown_binary_version_is_rejected():
+    data = bytearray(serialization.encode_api_log_binary(RECORD))
+    data[1] = serialization.API_LOG_SCHEMA_VERSION + 1
+    with pytest.raises(ValueError):
+        serialization.api_log_deserializer(bytes(data))
+
+
+@pytest.mark.parametrize('value', [b'{not json', b'\xa1\x01\x00', b''])
+def test_safe_deserializer_returns_none_for_corrupt_records(value):
+    assert serialization.safe_api_log_deserializer(value) is None
+
+
+def test_codecs_produce_same_json():
+    payload = {'id': 1, 'created_at': datetime(2026, 1, 1), 'text': '한글'}
+    encoded = {codec.name: codec.dumps_bytes(payload) for codec in serialization.available_codecs()}
+    assert len(set(encoded.values())) == 1
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import LeaderAbortedError, SingleFlight
+
+
+def run_concurrently(count, target):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight('test_share')
+    calls = []
+    release = threading.Event()
+
+    def query():
+        calls.append(1)
+        release.wait(timeout=5)
+        return ['row']
+
+    def request():
+        return flight.do(('messages', 1), query)
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results, errors = run_concurrently(8, request)
+
+    assert errors == []
+    assert len(calls) == 1
+    assert results == [['row']] * 8
+
+
+def test_error_is_propagated_to_all_waiters():
+    flight = SingleFlight('test_error')
+    calls = []
+    release = threading.Event()
+
+    def query():
+        calls.append(1)
+        release.wait(timeout=5)
+        raise RuntimeError("db down")
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    results, errors = run_concurrently(5, lambda: flight.do('key', query))
+
+    assert results == []
+    assert len(calls) == 1
+    assert len(errors) == 5
+    assert all(isinstance(e, RuntimeError) and str(e) == "db down" for e in errors)
+
+
+def test_error_is_not_cached():
+    flight = SingleFlight('test_error_retry', cache_ttl=60)
+
+    def failing_query():
+        raise RuntimeError("db down")
+
+    with pytest.raises(RuntimeError):
+        flight.do('key', failing_query)
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+class Cancelled(BaseException):
+    """GreenletExit/gevent Timeout처럼 Exception이 아닌 취소 예외"""
+
+
+def test_cancelled_leader_fails_followers_and_is_not_cached():
+    flight = SingleFlight('test_cancelled', cache_ttl=60)
+    release = threading.Event()
+
+    def query():
+        release.wait(timeout=5)
+        raise Cancelled()
+
+    follower_errors = []
+
+    def follower():
+        time.sleep(0.05)
+        try:
+            flight.do('key', lambda: 'follower ran')
+        except Exception as e:
+            follower_errors.append(e)
+
+    thread = threading.Thread(target=follower)
+    thread.start()
+    threading.Timer(0.1, release.set).start()
+    with pytest.raises(Cancelled):
+        flight.do('key', query)
+    thread.join(timeout=5)
+
+    assert len(follower_errors) == 1 and isinstance(follower_errors[0], LeaderAbortedError)
+    assert flight.do('key', lambda: 'fresh') == 'fresh'
+
+
+def test_different_keys_execute_separately():
+    flight = SingleFlight('test_keys')
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+
+
+def test_micro_cache_and_invalidate():
+    flight = SingleFlight('test_cache', cache_ttl=60)
+    calls = []
+
+    def query():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('key', query) == 1
+    assert flight.do('key', query) == 1
+    flight.invalidate()
+    assert flight.do('key', query) == 2
+
+
+def test_without_cache_ttl_completed_results_are_not_reused():
+    flight = SingleFlight('test_no_cache')
+    calls = []
+
+    def query():
+        calls.append(1)
+        time.sleep(0.01)
+        return len(calls)
+
+    assert flight.do('key', query) == 1
+    assert flight.do('key', query) == 2
@@ -0,0 +1,120 @@
+# username <-> user_id 조회 캐시
+# 프로세스 내 TTL 캐시 -> Redis(user:id:{username}, user:name:{id}) -> DB 순으로 조회하고,
+# 로그인/회원가입 시 미리 채워 둔다. 메시지 조회 쿼리는 users JOIN 없이 user_id로만 필터링하고
+# 유저명은 이 캐시에서 붙인다.
+import logging
+import threading
+import time
+
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+USER_LOOKUPS = Counter('user_directory_lookups_total', 'username/user_id lookups by the source that answered', ['source'])
+
+
+class UserDirectory:
+    def __init__(self, redis_client, load_by_ids, load_by_usernames, breaker=None,
+                 local_ttl=300.0, redis_ttl=86400, max_entries=100000):
+        """load_by_ids/load_by_usernames: 키 목록 -> [(id, username)] 를 반환하는 DB 조회 함수"""
+        self._redis = redis_client
+        self._load_by_ids = load_by_ids
+        self._load_by_usernames = load_by_usernames
+        self._breaker = breaker
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._ids = {}    # username -> (만료시각, id)
+        self._names = {}  # id -> (만료시각, username)
+
+    def _redis_call(self, func, *args):
+        # Redis 장애 시 None을 반환하여 DB 조회로 넘어감 (breaker가 열려 있으면 호출 생략)
+        try:
+            if self._breaker is not None:
+                return self._breaker.call(func, *args)
+            return func(*args)
+        except Exception as e:
+            logger.debug(f"user directory Redis 호출 실패: {str(e)}")
+            return None
+
+    def _remember_local(self, pairs, names=True):
+        # username 키는 DB collation(대소문자 무시)과 맞추기 위해 소문자로 저장
+        expires_at = time.monotonic() + self.local_ttl
+        with self._lock:
+            if len(self._ids) + len(self._names) + 2 * len(pairs) > self.max_entries:
+                self._ids.clear()
+                self._names.clear()
+            for user_id, username in pairs:
+                self._ids[username.lower()] = (expires_at, user_id)
+                if names:
+                    self._names[user_id] = (expires_at, username)
+
+    def remember(self, pairs, persist=True):
+        """DB에서 읽은 (id, username) 목록을 캐시에 기록 (persist=True 이면 Redis에도 기록)"""
+        pairs = [(int(user_id), username) for user_id, username in pairs]
+        if not pairs:
+            return
+        self._remember_local(pairs)
+        if persist:
+            def _store():
+                pipe = self._redis.pipeline(transaction=False)
+                for user_id, username in pairs:
+                    pipe.set(f"user:id:{username.lower()}", user_id, ex=self.redis_ttl)
+                    pipe.set(f"user:name:{user_id}", username, ex=self.redis_ttl)
+                pipe.execute()
+            self._redis_call(_store)
+
+    def _cached(self, local, keys):
+        """로컬 캐시에서 찾은 {key: value}와 없는 키 목록"""
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = local.get(key)
+                if entry is not None and entry[0] > now:
+                    found[key] = entry[1]
+                else:
+                    missing.append(key)
+        if found:
+            USER_LOOKUPS.labels(source='local').inc(len(found))
+        return found, missing
+
+    def _from_redis(self, prefix, keys):
+        values = self._redis_call(self._redis.mget, [f"{prefix}{key}" for key in keys]) or [None] * len(keys)
+        hits = {key: value for key, value in zip(keys, values) if value is not None}
+        if hits:
+            USER_LOOKUPS.labels(source='redis').inc(len(hits))
+        return hits, [key for key in keys if key not in hits]
+
+    def usernames_of(self, user_ids):
+        """{user_id: username} (존재하지 않는 id는 제외)"""
+        found, missing = self._cached(self._names, {int(user_id) for user_id in user_ids if user_id is not None})
+        if not missing:
+            return found
+        hits, missing = self._from_redis('user:name:', missing)
+        self._remember_local(hits.items())
+        found.update(hits)
+        if missing:
+            USER_LOOKUPS.labels(source='db').inc(len(missing))
+            loaded = self._load_by_ids(missing)
+            self.remember(loaded)
+            found.update((int(user_id), username) for user_id, username in loaded)
+        return found
+
+    def id_of(self, username):
+        """username의 user_id (대소문자 무시), 없는 사용자면 None"""
+        key = username.lower()
+        found, missing = self._cached(self._ids, [key])
+        if not missing:
+            return found[key]
+        hits, missing = self._from_redis('user:id:', missing)
+        if hits:
+            user_id = int(hits[key])
+            # Redis 키는 소문자 username이므로 id -> username 캐시는 채우지 않음
+            self._remember_local([(user_id, key)], names=False)
+            return user_id
+        USER_LOOKUPS.labels(source='db').inc()
+        loaded = self._load_by_usernames([username])
+        self.remember(loaded)
+        return int(loaded[0][0]) if loaded else None
@@ -10,14 +10,49 @@ CREATE TABLE IF NOT EXISTS users (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- 메시지 테이블 생성 (user_id 컬럼 포함)
+-- 메시지 테이블 생성 (created_at 기준 월별 RANGE 파티션)
+-- 파티션 테이블은 FOREIGN KEY를 지원하지 않으므로 user_id 관계는 아래 트리거로 강제한다.
+-- 모든 UNIQUE/PRIMARY KEY에 파티션 컬럼(created_at)이 포함되어야 한다.
+-- 월별 파티션은 backend/partition_maintenance.py가 pmax를 분할하여 미리 생성한다.
 CREATE TABLE IF NOT EXISTS messages (
-    id INT AUTO_INCREMENT PRIMARY KEY,
+    id INT AUTO_INCREMENT,
     user_id INT,
     message TEXT NOT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id, created_at),
+    KEY idx_messages_created_at (created_at),
+    KEY idx_messages_user_created_at (user_id, created_at)
+)
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_start VALUES LESS THAN (UNIX_TIMESTAMP('2026-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
 );
 
 -- 기존 messages 테이블에 user_id 컬럼이 없다면 추가
-ALTER TABLE messages ADD COLUMN IF NOT EXISTS user_id INT; 
\ No newline at end of file
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS user_id INT;
+
+-- messages.user_id -> users.id 참조 무결성 (FOREIGN KEY 대체)
+DELIMITER $$
+
+CREATE TRIGGER IF NOT EXISTS messages_user_fk_insert
+BEFORE INSERT ON messages FOR EACH ROW
+BEGIN
+    IF NEW.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users WHERE id = NEW.user_id) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'messages.user_id references unknown users.id';
+    END IF;
+END$$
+
+CREATE TRIGGER IF NOT EXISTS messages_user_fk_update
+BEFORE UPDATE ON messages FOR EACH ROW
+BEGIN
+    IF NEW.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users WHERE id = NEW.user_id) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'messages.user_id references unknown users.id';
+    END IF;
+END$$
+
+DELIMITER ;
+
+-- ON DELETE CASCADE 대체
+CREATE TRIGGER IF NOT EXISTS users_delete_messages
+AFTER DELETE ON users FOR EACH ROW
+DELETE FROM messages WHERE user_id = OLD.id;
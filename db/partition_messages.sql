@@ -0,0 +1,47 @@
+-- 기존(비파티션) messages 테이블을 월별 파티션 테이블로 변환하는 마이그레이션
+-- 실행 전 백업 필수. 테이블을 재작성하므로 트래픽이 적은 시간에 실행한다.
+USE testdb;
+
+-- 파티션 테이블은 FOREIGN KEY를 가질 수 없으므로 제거 (기본 이름: messages_ibfk_1)
+ALTER TABLE messages DROP FOREIGN KEY messages_ibfk_1;
+
+-- PRIMARY KEY에 파티션 컬럼 포함 및 인덱스 추가
+ALTER TABLE messages
+    MODIFY created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at),
+    ADD KEY idx_messages_created_at (created_at),
+    ADD KEY idx_messages_user_created_at (user_id, created_at);
+
+ALTER TABLE messages
+PARTITION BY RANGE (UNIX_TIMESTAMP(created_at)) (
+    PARTITION p_start VALUES LESS THAN (UNIX_TIMESTAMP('2026-01-01 00:00:00')),
+    PARTITION pmax VALUES LESS THAN MAXVALUE
+);
+
+-- user_id 참조 무결성 트리거 (init.sql과 동일)
+DELIMITER $$
+
+CREATE TRIGGER IF NOT EXISTS messages_user_fk_insert
+BEFORE INSERT ON messages FOR EACH ROW
+BEGIN
+    IF NEW.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users WHERE id = NEW.user_id) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'messages.user_id references unknown users.id';
+    END IF;
+END$$
+
+CREATE TRIGGER IF NOT EXISTS messages_user_fk_update
+BEFORE UPDATE ON messages FOR EACH ROW
+BEGIN
+    IF NEW.user_id IS NOT NULL AND NOT EXISTS (SELECT 1 FROM users WHERE id = NEW.user_id) THEN
+        SIGNAL SQLSTATE '23000' SET MESSAGE_TEXT = 'messages.user_id references unknown users.id';
+    END IF;
+END$$
+
+DELIMITER ;
+
+CREATE TRIGGER IF NOT EXISTS users_delete_messages
+AFTER DELETE ON users FOR EACH ROW
+DELETE FROM messages WHERE user_id = OLD.id;
+
+-- 이후 월별 파티션 생성: cd backend && python partition_maintenance.py